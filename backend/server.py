@@ -1,82 +1,250 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, File, UploadFile, Form, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, APIRouter, BackgroundTasks, HTTPException, Depends, Request, File, UploadFile, Form, WebSocket, WebSocketDisconnect
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse, ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
 import os
+import re
+import time
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr
+from functools import lru_cache
+from collections import Counter
+from email.utils import format_datetime
+from pydantic import BaseModel, Field, EmailStr, field_serializer
 from typing import List, Optional, Dict, Any
 import uuid
+import copy
 from datetime import datetime, timezone, timedelta
+from dateutil.relativedelta import relativedelta
 import bcrypt
 import jwt
 from bson import ObjectId
-import json
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+import orjson
 from emergentintegrations.payments.stripe.checkout import StripeCheckout, CheckoutSessionResponse, CheckoutStatusResponse, CheckoutSessionRequest
 from emergentintegrations.payments.stripe.connect import StripeConnect, ConnectAccountResponse, ConnectOnboardingResponse
-import io
 import gridfs
 import asyncio
-from cryptography.fernet import Fernet
+from concurrent.futures import ThreadPoolExecutor
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from cryptography.hazmat.primitives import hashes
 import base64
 import hashlib
+import hmac
 from decimal import Decimal, ROUND_HALF_UP
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+def required_env(name: str) -> str:
+    """Read a setting the server can't run without, failing with a pointer to the docs"""
+    value = os.environ.get(name)
+    if not value:
+        raise RuntimeError(
+            f"{name} is not set. Add it to backend/.env (see backend/.env.example and the README)."
+        )
+    return value
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(
+    mongo_url,
+    maxPoolSize=int(os.environ.get('MONGO_MAX_POOL_SIZE', '200')),
+    minPoolSize=int(os.environ.get('MONGO_MIN_POOL_SIZE', '20')),
+    maxConnecting=4,  # Avoids a handshake storm when a cold pool is hit by a burst
+    maxIdleTimeMS=300_000,
+    waitQueueTimeoutMS=2000,
+    serverSelectionTimeoutMS=3000,
+    compressors=os.environ.get('MONGO_COMPRESSORS', 'zstd,zlib'),
+    zlibCompressionLevel=-1,
+    retryWrites=True
+)
 db = client[os.environ['DB_NAME']]
 fs = AsyncIOMotorGridFSBucket(db)
+fs_files = db.fs.files
+fs_chunks = db.fs.chunks
 
 # Configuration
 PLATFORM_COMMISSION_RATE = 0.099  # 9.9% commission rate
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-here')
 JWT_ALGORITHM = 'HS256'
+_JWT_KEY_BYTES = JWT_SECRET.encode()
+_JWT_ALGORITHMS = [JWT_ALGORITHM]
+_JWT_DECODE_OPTIONS = {"require": ["exp", "sub"]}
+_jwt_decoder = jwt.PyJWT()
+
+# Auth cache: sha256(token) -> (User, exp), so repeat requests skip jwt.decode + users lookup.
+# It also fronts the shared revocation list: a logout on another worker takes effect here once
+# this token's entry expires, i.e. within AUTH_CACHE_TTL_SECONDS
+AUTH_CACHE_TTL_SECONDS = int(os.environ.get('AUTH_CACHE_TTL_SECONDS', '30'))
+_auth_cache: TTLCache = TTLCache(maxsize=10000, ttl=AUTH_CACHE_TTL_SECONDS)
+# Creator id by user id. Only hits are cached (a fan may become a creator), and a user's creator id never changes
+CREATOR_ID_CACHE_TTL_SECONDS = int(os.environ.get('CREATOR_ID_CACHE_TTL_SECONDS', '300'))
+_creator_id_cache: TTLCache = TTLCache(maxsize=10000, ttl=CREATOR_ID_CACHE_TTL_SECONDS)
+# Logged-out tokens: sha256(token) -> exp. The shared record is the revoked_tokens collection
+# (TTL-indexed on expires_at); this is the worker's local copy of the revocations it has seen
+_revoked_tokens: Dict[bytes, float] = {}
+
+# Password hashing: bcrypt over HMAC-SHA256(pepper, password). The server-side pepper is what
+# allows a lower bcrypt cost, so it is required; raw-bcrypt hashes from before it are upgraded on login.
+# Stored as hmac-sha256$<pepper id>$<bcrypt hash> so the pepper can be rotated: set a new
+# PASSWORD_PEPPER/PASSWORD_PEPPER_ID and list the old ones in PASSWORD_PEPPERS_RETIRED ("id:pepper,...").
+PASSWORD_PEPPER = required_env('PASSWORD_PEPPER').encode()
+PASSWORD_PEPPER_ID = os.environ.get('PASSWORD_PEPPER_ID', '1')
+_password_peppers: Dict[str, bytes] = {
+    pepper_id: pepper.encode()
+    for pepper_id, pepper in (
+        entry.split(':', 1) for entry in os.environ.get('PASSWORD_PEPPERS_RETIRED', '').split(',') if entry
+    )
+}
+_password_peppers[PASSWORD_PEPPER_ID] = PASSWORD_PEPPER
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '10'))
+PEPPERED_HASH_PREFIX = 'hmac-sha256$'
+
+# bcrypt releases the GIL, so hashing on a dedicated pool keeps the event loop free
+_bcrypt_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="bcrypt")
+
+# Searches shorter than this fall back to a prefix match instead of $text
+MIN_TEXT_SEARCH_LENGTH = 3
+
+# Uploads are copied into GridFS in pieces of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# GridFS chunk sizes: the bucket default, and a larger one for video so uploads need far fewer chunks
+GRIDFS_DEFAULT_CHUNK_SIZE = 255 * 1024
+VIDEO_GRIDFS_CHUNK_SIZE = 4 * 1024 * 1024
+# Upload chunk documents are flushed in insert_many batches of roughly this many bytes
+GRIDFS_INSERT_BATCH_BYTES = 8 * 1024 * 1024
+# Small GridFS files (banners, thumbnails, short clips) are kept in memory by file id; access checks
+# still run on every request. Entries stay valid only because GridFS files are immutable and never
+# deleted; code that starts deleting or replacing them must also evict them from _gridfs_file_cache
+GRIDFS_CACHE_MAX_FILE_SIZE = 1024 * 1024
+GRIDFS_CACHE_BYTES = int(os.environ.get('GRIDFS_CACHE_BYTES', str(128 * 1024 * 1024)))
+# Per-route upload limits
+BANNER_MAX_SIZE = 5 * 1024 * 1024
+WELCOME_VIDEO_MAX_SIZE = 50 * 1024 * 1024
+MESSAGE_FILE_MAX_SIZE = 50 * 1024 * 1024
+# Room left for multipart boundaries and the other form fields when checking Content-Length
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+# Cap on uploads copied into GridFS at once; further uploads wait their turn
+MAX_CONCURRENT_UPLOADS = int(os.environ.get('MAX_CONCURRENT_UPLOADS', '16'))
+_upload_semaphore = asyncio.Semaphore(MAX_CONCURRENT_UPLOADS)
+
+# Most tags kept on a piece of content
+MAX_TAGS = 32
+
+# Content type by MIME top-level type; anything else is stored as text
+CONTENT_TYPES_BY_MIME_PREFIX = {"image": "image", "video": "video", "audio": "audio"}
+
+# Interval between occurrences of recurring scheduled content
+RECURRENCE_INTERVALS = {
+    'daily': relativedelta(days=1),
+    'weekly': relativedelta(weeks=1),
+    'monthly': relativedelta(months=1)
+}
+
+# In-process publisher: sleeps until the next scheduled item is due, but never longer than this,
+# so items written by other workers or directly in Mongo are still picked up
+SCHEDULER_MAX_SLEEP_SECONDS = int(os.environ.get('SCHEDULER_MAX_SLEEP_SECONDS', '60'))
+SCHEDULER_ERROR_RETRY_SECONDS = 10
+# A claim older than this is treated as abandoned (crashed or failed worker) and can be taken over
+SCHEDULER_CLAIM_LEASE_SECONDS = int(os.environ.get('SCHEDULER_CLAIM_LEASE_SECONDS', '300'))
+# Namespace for the deterministic ids of recurrences, so a retried run can't schedule one twice
+RECURRENCE_ID_NAMESPACE = uuid.UUID('6f1c2a8e-3b7d-4e25-9a61-0c4d8b9e2f17')
+# Set when a schedule is created or moved, so the publisher re-reads the next due time
+_scheduler_wakeup = asyncio.Event()
+_scheduler_task: Optional[asyncio.Task] = None
 
 # Stripe Configuration
 STRIPE_API_KEY = os.environ.get('STRIPE_API_KEY')
+# Public origin for Stripe redirect and webhook URLs; falls back to the request's base URL when unset
+PUBLIC_BASE_URL = os.environ.get('PUBLIC_BASE_URL', '').rstrip('/')
+# With PUBLIC_BASE_URL set, one client built at startup serves every request
+_stripe_checkout: Optional[StripeCheckout] = None
 
 # Encryption Configuration
-ENCRYPTION_KEY = os.environ.get('ENCRYPTION_KEY', Fernet.generate_key().decode())
+# Required: messages are decrypted with it later, so a per-process random key would lose them.
+# A Fernet-format key (Fernet.generate_key()); the AES-GCM key is derived from it with HKDF
+ENCRYPTION_KEY = required_env('ENCRYPTION_KEY')
 
 # API Configuration
 API = os.environ.get('API_BASE_URL', f'{os.environ.get("REACT_APP_BACKEND_URL", "http://localhost:8000")}/api')
 
+# Per-connection outbound queue size; when a slow client falls this far behind, its oldest frames are dropped
+WS_OUTBOX_SIZE = 256
+
 # WebSocket Connection Manager
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
+        self._outboxes: Dict[str, asyncio.Queue] = {}
+        self._writers: Dict[str, asyncio.Task] = {}
     
     async def connect(self, websocket: WebSocket, user_id: str):
         await websocket.accept()
+        # A new connection replaces any previous one for the same user
+        self.disconnect(user_id)
+        outbox = asyncio.Queue(maxsize=WS_OUTBOX_SIZE)
         self.active_connections[user_id] = websocket
-    
-    def disconnect(self, user_id: str):
-        if user_id in self.active_connections:
-            del self.active_connections[user_id]
+        self._outboxes[user_id] = outbox
+        self._writers[user_id] = asyncio.create_task(self._writer(user_id, websocket, outbox))
+    
+    def disconnect(self, user_id: str, websocket: Optional[WebSocket] = None):
+        # When a socket is given, only drop the registration if it is still that socket
+        if user_id not in self.active_connections:
+            return
+        if websocket is not None and self.active_connections[user_id] is not websocket:
+            return
+        
+        del self.active_connections[user_id]
+        self._outboxes.pop(user_id, None)
+        writer = self._writers.pop(user_id, None)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
     
     async def send_personal_message(self, message: dict, user_id: str):
-        if user_id in self.active_connections:
-            try:
-                await self.active_connections[user_id].send_text(json.dumps(message))
-            except:
-                # Connection might be closed, remove it
-                self.disconnect(user_id)
+        self._enqueue(orjson.dumps(message).decode(), user_id)
     
     async def broadcast_to_conversation(self, message: dict, user_ids: List[str]):
+        # Encode once and share the payload between recipients
+        payload = orjson.dumps(message).decode()
         for user_id in user_ids:
-            await self.send_personal_message(message, user_id)
+            self._enqueue(payload, user_id)
+    
+    def _enqueue(self, payload: str, user_id: str):
+        outbox = self._outboxes.get(user_id)
+        if outbox is None:
+            return
+        if outbox.full():
+            outbox.get_nowait()
+        outbox.put_nowait(payload)
+    
+    async def _writer(self, user_id: str, websocket: WebSocket, outbox: asyncio.Queue):
+        # Text frames: the web client JSON.parse()s event.data directly
+        try:
+            while True:
+                payload = await outbox.get()
+                await websocket.send_text(payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Connection might be closed, remove it
+            self.disconnect(user_id, websocket)
 
 manager = ConnectionManager()
 
 # Create the main app
-app = FastAPI(title="Creator Subscription Platform", version="1.0.0")
+app = FastAPI(title="Creator Subscription Platform", version="1.0.0", default_response_class=ORJSONResponse)
 api_router = APIRouter(prefix="/api")
 security = HTTPBearer()
 
@@ -122,6 +290,8 @@ class Creator(BaseModel):
     subscription_price: float
     follower_count: int = 0
     content_count: int = 0
+    subscriber_count: int = 0
+    total_revenue: float = 0.0
     rating: float = 0.0
     is_verified: bool = False
     banner_url: Optional[str] = None
@@ -164,7 +334,7 @@ class Content(BaseModel):
     title: str
     description: str
     content_type: str  # 'image', 'video', 'text', 'audio'
-    file_path: Optional[str] = None
+    file_path: Optional[Any] = None  # GridFS ObjectId (older documents hold its hex string)
     thumbnail_url: Optional[str] = None
     is_premium: bool = False
     is_ppv: bool = False  # Pay-per-view
@@ -173,6 +343,10 @@ class Content(BaseModel):
     likes: int = 0
     views: int = 0
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    
+    @field_serializer('file_path', when_used='json')
+    def serialize_file_path(self, file_path: Optional[Any]) -> Optional[str]:
+        return str(file_path) if file_path is not None else None
 
 class ContentCreate(BaseModel):
     title: str
@@ -188,7 +362,7 @@ class ScheduledContent(BaseModel):
     title: str
     description: str
     content_type: str  # 'image', 'video', 'text', 'audio'
-    file_path: Optional[str] = None
+    file_path: Optional[Any] = None  # GridFS ObjectId (older documents hold its hex string)
     thumbnail_url: Optional[str] = None
     is_premium: bool = False
     is_ppv: bool = False
@@ -201,6 +375,10 @@ class ScheduledContent(BaseModel):
     status: str = "scheduled"  # 'scheduled', 'published', 'cancelled'
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     published_at: Optional[datetime] = None
+    
+    @field_serializer('file_path', when_used='json')
+    def serialize_file_path(self, file_path: Optional[Any]) -> Optional[str]:
+        return str(file_path) if file_path is not None else None
 
 class ScheduledContentCreate(BaseModel):
     title: str
@@ -265,6 +443,8 @@ class Conversation(BaseModel):
     is_blocked: bool = False
     blocked_by: Optional[str] = None
     last_message_at: Optional[datetime] = None
+    last_message: Optional[Dict[str, Any]] = None  # Latest message, without its encryption key
+    unread_counts: Dict[str, int] = Field(default_factory=dict)  # Participant user id -> unread messages
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class Message(BaseModel):
@@ -284,7 +464,7 @@ class Message(BaseModel):
     tip_amount: Optional[float] = None
     is_read: bool = False
     is_encrypted: bool = False
-    encryption_key: Optional[str] = None
+    encryption_key: Optional[str] = None  # Only set on legacy messages; new ones use the server key
     auto_destruct_at: Optional[datetime] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     read_at: Optional[datetime] = None
@@ -393,52 +573,378 @@ class SubscriptionRequest(BaseModel):
     plan_type: str
 
 # Utility Functions
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+def prehash_password(password: str, pepper: bytes = PASSWORD_PEPPER) -> bytes:
+    """Peppered HMAC of the password, base64 encoded so bcrypt sees no NUL bytes"""
+    digest = hmac.new(pepper, password.encode('utf-8'), hashlib.sha256).digest()
+    return base64.b64encode(digest)
+
+def split_peppered_hash(hashed: str) -> tuple[str, str]:
+    """Split a peppered hash into (pepper id, bcrypt hash)"""
+    pepper_id, bcrypt_hash = hashed[len(PEPPERED_HASH_PREFIX):].split('$', 1)
+    return pepper_id, bcrypt_hash
+
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    hashed = await loop.run_in_executor(
+        _bcrypt_pool, bcrypt.hashpw, prehash_password(password), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    )
+    return f"{PEPPERED_HASH_PREFIX}{PASSWORD_PEPPER_ID}${hashed.decode('utf-8')}"
+
+async def verify_password(password: str, hashed: str) -> bool:
+    loop = asyncio.get_running_loop()
+    if hashed.startswith(PEPPERED_HASH_PREFIX):
+        pepper_id, hashed = split_peppered_hash(hashed)
+        pepper = _password_peppers.get(pepper_id)
+        if pepper is None:
+            logger.error("Password hash uses unknown pepper id %s; add it to PASSWORD_PEPPERS_RETIRED", pepper_id)
+            return False
+        candidate = prehash_password(password, pepper)
+    else:
+        # Legacy hash of the raw password
+        candidate = password.encode('utf-8')
+    return await loop.run_in_executor(_bcrypt_pool, bcrypt.checkpw, candidate, hashed.encode('utf-8'))
+
+def password_needs_rehash(hashed: str) -> bool:
+    """Whether a stored hash predates the current scheme or cost factor"""
+    if not hashed.startswith(PEPPERED_HASH_PREFIX):
+        return True
+    pepper_id, bcrypt_hash = split_peppered_hash(hashed)
+    # bcrypt format: $2b$<rounds>$...
+    return pepper_id != PASSWORD_PEPPER_ID or int(bcrypt_hash.split('$')[2]) != BCRYPT_ROUNDS
 
 def create_jwt_token(data: dict):
     expires_delta = timedelta(days=30)
     expire = datetime.now(timezone.utc) + expires_delta
     to_encode = data.copy()
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, _JWT_KEY_BYTES, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
-def encrypt_message(content: str) -> tuple[str, str]:
-    """Encrypt message content and return encrypted content and key"""
-    fernet = Fernet(ENCRYPTION_KEY.encode() if isinstance(ENCRYPTION_KEY, str) else ENCRYPTION_KEY)
-    encrypted_content = fernet.encrypt(content.encode())
-    return base64.b64encode(encrypted_content).decode(), ENCRYPTION_KEY
-
-def decrypt_message(encrypted_content: str, key: str) -> str:
+def parse_iso_datetime(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp, accepting a trailing 'Z' for UTC"""
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    return datetime.fromisoformat(value)
+
+def parse_tags(tags: Optional[str]) -> List[str]:
+    """Split a comma-separated tag string into trimmed, lowercased, de-duplicated tags"""
+    normalized = (tag.strip().lower() for tag in (tags or "").split(","))
+    return list(dict.fromkeys(tag for tag in normalized if tag))[:MAX_TAGS]
+
+def classify_content_type(mime_type: Optional[str]) -> str:
+    """Map an upload's MIME type to the content type it is stored as"""
+    return CONTENT_TYPES_BY_MIME_PREFIX.get((mime_type or "").split("/", 1)[0], "text")
+
+def get_public_base_url(request: Request) -> str:
+    """Origin used to build Stripe success, cancel and webhook URLs"""
+    return PUBLIC_BASE_URL or str(request.base_url).rstrip('/')
+
+@lru_cache(maxsize=8)
+def build_stripe_checkout(webhook_url: str) -> StripeCheckout:
+    """StripeCheckout for a webhook URL; bounded, since without PUBLIC_BASE_URL the URL follows the Host header"""
+    return StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
+
+def get_stripe_checkout(webhook_url: str) -> StripeCheckout:
+    """Return the shared StripeCheckout client, falling back to one per webhook URL when unconfigured"""
+    if _stripe_checkout is not None:
+        return _stripe_checkout
+    return build_stripe_checkout(webhook_url)
+
+@lru_cache(maxsize=32)
+def get_fernet(key: str) -> Fernet:
+    """Return a Fernet instance for the key, reusing previously built ones"""
+    return Fernet(key.encode())
+
+# HKDF label for the message AES key, so it never doubles as the Fernet signing/encryption key
+MESSAGE_KEY_HKDF_INFO = b"marc/messages/aes-256-gcm/v1"
+
+@lru_cache(maxsize=32)
+def get_aesgcm(key: str) -> AESGCM:
+    """Return the AES-256-GCM cipher for messages, keyed by HKDF-SHA256 over a Fernet-format key"""
+    derived_key = HKDF(
+        algorithm=hashes.SHA256(), length=32, salt=None, info=MESSAGE_KEY_HKDF_INFO
+    ).derive(base64.urlsafe_b64decode(key.encode()))
+    return AESGCM(derived_key)
+
+# Prefix marking AES-GCM ciphertexts; Fernet tokens are plain base64 and never contain ':'
+AESGCM_PREFIX = "aesgcm2:"
+
+def encrypt_message(content: str) -> str:
+    """Encrypt message content with the server key"""
+    # Stored as prefix + base64url(nonce || ciphertext || tag); the key is never stored
+    nonce = os.urandom(12)
+    ciphertext = get_aesgcm(ENCRYPTION_KEY).encrypt(nonce, content.encode(), None)
+    return AESGCM_PREFIX + base64.urlsafe_b64encode(nonce + ciphertext).decode()
+
+def decrypt_message(encrypted_content: str, key: str = ENCRYPTION_KEY) -> str:
     """Decrypt message content"""
     try:
-        fernet = Fernet(key.encode() if isinstance(key, str) else key)
-        encrypted_bytes = base64.b64decode(encrypted_content.encode())
-        decrypted_content = fernet.decrypt(encrypted_bytes)
+        if encrypted_content.startswith(AESGCM_PREFIX):
+            payload = base64.urlsafe_b64decode(encrypted_content[len(AESGCM_PREFIX):].encode())
+            return get_aesgcm(key).decrypt(payload[:12], payload[12:], None).decode()
+        # Messages written before the switch to AES-GCM are Fernet tokens
+        fernet = get_fernet(key)
+        try:
+            decrypted_content = fernet.decrypt(encrypted_content.encode())
+        except InvalidToken:
+            # Older messages wrapped the Fernet token in a second layer of base64
+            decrypted_content = fernet.decrypt(base64.b64decode(encrypted_content.encode()))
         return decrypted_content.decode()
     except:
         return "[Message could not be decrypted]"
 
-def generate_file_hash(file_content: bytes) -> str:
-    """Generate SHA-256 hash of file content"""
-    return hashlib.sha256(file_content).hexdigest()
-
-def serialize_doc(doc):
-    """Convert MongoDB document to JSON serializable format"""
-    if isinstance(doc, dict):
-        return {k: serialize_doc(v) for k, v in doc.items()}
-    elif isinstance(doc, list):
-        return [serialize_doc(item) for item in doc]
-    elif isinstance(doc, ObjectId):
-        return str(doc)
-    elif isinstance(doc, datetime):
-        return doc.isoformat()
-    else:
-        return doc
+def decrypt_messages(messages: List[dict]) -> List[dict]:
+    """Decrypt message documents in place and strip any legacy stored keys"""
+    for msg in messages:
+        # Older messages carry the key they were written with; new ones use ENCRYPTION_KEY
+        encryption_key = msg.pop('encryption_key', None) or ENCRYPTION_KEY
+        if msg.get('is_encrypted') and msg.get('content'):
+            msg['content'] = decrypt_message(msg['content'], encryption_key)
+    return messages
+
+
+def orjson_default(obj):
+    """Encode the BSON types orjson doesn't handle natively"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError
+
+class MongoJSONResponse(ORJSONResponse):
+    """JSON response for raw MongoDB documents; ObjectIds are emitted as strings"""
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+def parse_range_header(range_header: Optional[str], file_length: int) -> Optional[tuple[int, int]]:
+    """Parse a single-range `Range: bytes=...` header into inclusive (start, end) offsets"""
+    if not range_header:
+        return None
+    
+    unit, _, byte_range = range_header.partition('=')
+    if unit.strip() != 'bytes' or ',' in byte_range:
+        raise HTTPException(
+            status_code=416,
+            detail="Invalid range",
+            headers={"Content-Range": f"bytes */{file_length}"}
+        )
+    
+    start_str, _, end_str = byte_range.strip().partition('-')
+    try:
+        if start_str:
+            start = int(start_str)
+            end = int(end_str) if end_str else file_length - 1
+        else:
+            # Suffix range: last N bytes
+            start = max(file_length - int(end_str), 0)
+            end = file_length - 1
+    except ValueError:
+        start, end = file_length, -1
+    
+    end = min(end, file_length - 1)
+    if start > end or start >= file_length:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{file_length}"}
+        )
+    return start, end
+
+class CachedGridOut:
+    """In-memory copy of a small GridFS file, read through the same attributes and read/seek as GridOut"""
+    def __init__(self, grid_out, data: bytes):
+        self._id = grid_out._id
+        self.filename = grid_out.filename
+        self.length = grid_out.length
+        self.upload_date = grid_out.upload_date
+        self.metadata = grid_out.metadata
+        self.chunk_size = grid_out.chunk_size
+        self._data = data
+        self._position = 0
+    
+    def reader(self) -> "CachedGridOut":
+        """A fresh reader at position 0, sharing the cached bytes"""
+        reader = copy.copy(self)
+        reader._position = 0
+        return reader
+    
+    def seek(self, position: int):
+        self._position = position
+    
+    async def read(self, size: int = -1) -> bytes:
+        end = self.length if size < 0 else min(self._position + size, self.length)
+        data = self._data[self._position:end]
+        self._position = end
+        return data
+
+_gridfs_file_cache: TTLCache = TTLCache(
+    maxsize=GRIDFS_CACHE_BYTES,
+    ttl=600,
+    getsizeof=lambda cached: cached.length + 1024  # Rough per-entry overhead
+)
+
+async def open_gridfs_file(file_id: ObjectId):
+    """Open a GridFS file for reading, serving small files from the in-process cache"""
+    cached = _gridfs_file_cache.get(file_id)
+    if cached is not None:
+        return cached.reader()
+    
+    grid_out = await fs.open_download_stream(file_id)
+    if grid_out.length > GRIDFS_CACHE_MAX_FILE_SIZE:
+        return grid_out
+    cached = CachedGridOut(grid_out, await grid_out.read())
+    _gridfs_file_cache[file_id] = cached
+    return cached.reader()
+
+async def iter_grid_out(grid_out, start: int = 0, end: Optional[int] = None):
+    """Yield a GridFS file one chunk at a time, optionally limited to [start, end]"""
+    if end is None:
+        end = grid_out.length - 1
+    if start:
+        grid_out.seek(start)
+    
+    remaining = end - start + 1
+    while remaining > 0:
+        chunk = await grid_out.read(min(remaining, grid_out.chunk_size))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+def gridfs_etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches the (strong or weak) ETag"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return '*' in candidates or any(candidate.removeprefix('W/') == etag for candidate in candidates)
+
+def gridfs_streaming_response(
+    grid_out,
+    media_type: str,
+    request: Request,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """Stream a GridFS file without buffering it, honouring Range and If-None-Match headers"""
+    # GridFS files are immutable, so the file id is a stable validator
+    headers = {
+        **(headers or {}),
+        "ETag": f'"{grid_out._id}"',
+        "Last-Modified": format_datetime(grid_out.upload_date.replace(tzinfo=timezone.utc), usegmt=True)
+    }
+    if gridfs_etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    # Media routes bypass compression (see MediaAwareGZipMiddleware), so byte ranges stay valid
+    headers["Accept-Ranges"] = "bytes"
+    byte_range = parse_range_header(request.headers.get("range"), grid_out.length)
+    
+    if byte_range is None:
+        headers["Content-Length"] = str(grid_out.length)
+        return StreamingResponse(iter_grid_out(grid_out), media_type=media_type, headers=headers)
+    
+    start, end = byte_range
+    headers["Content-Length"] = str(end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{grid_out.length}"
+    return StreamingResponse(
+        iter_grid_out(grid_out, start, end),
+        status_code=206,
+        media_type=media_type,
+        headers=headers
+    )
+
+async def upload_to_gridfs(
+    file: UploadFile,
+    filename: str,
+    metadata: Dict[str, Any],
+    max_size: Optional[int] = None,
+    too_large_detail: str = "File too large",
+    store_hash: bool = False
+) -> tuple[ObjectId, int]:
+    """Copy an UploadFile into GridFS chunk by chunk instead of reading it whole.
+    
+    Returns the GridFS file id and the number of bytes written. With store_hash, the
+    SHA-256 of the content is computed on the same pass and saved as metadata.file_hash.
+    Videos are stored in VIDEO_GRIDFS_CHUNK_SIZE chunks, everything else in the bucket default.
+    Chunk documents are written in insert_many batches of about GRIDFS_INSERT_BATCH_BYTES
+    rather than one insert per chunk, using the same layout GridFSBucket reads.
+    """
+    # Reject early when the spooled upload already reports its size
+    if max_size is not None and file.size is not None and file.size > max_size:
+        raise HTTPException(status_code=400, detail=too_large_detail)
+    
+    chunk_size = GRIDFS_DEFAULT_CHUNK_SIZE
+    if classify_content_type(file.content_type) == "video":
+        chunk_size = VIDEO_GRIDFS_CHUNK_SIZE
+    
+    async with _upload_semaphore:
+        file_id = ObjectId()
+        file_hash = hashlib.sha256() if store_hash else None
+        size = 0
+        pending = bytearray()
+        chunk_docs = []
+        chunk_number = 0
+        try:
+            while data := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(data)
+                if max_size is not None and size > max_size:
+                    raise HTTPException(status_code=400, detail=too_large_detail)
+                if file_hash is not None:
+                    file_hash.update(data)
+                pending += data
+                while len(pending) >= chunk_size:
+                    chunk_docs.append({"files_id": file_id, "n": chunk_number, "data": bytes(pending[:chunk_size])})
+                    del pending[:chunk_size]
+                    chunk_number += 1
+                if len(chunk_docs) * chunk_size >= GRIDFS_INSERT_BATCH_BYTES:
+                    await fs_chunks.insert_many(chunk_docs)
+                    chunk_docs = []
+            if pending:
+                chunk_docs.append({"files_id": file_id, "n": chunk_number, "data": bytes(pending)})
+            if chunk_docs:
+                await fs_chunks.insert_many(chunk_docs)
+            
+            if file_hash is not None:
+                metadata = {**metadata, "file_hash": file_hash.hexdigest()}
+            # The files document goes in last, so readers never see a partially written file
+            await fs_files.insert_one({
+                "_id": file_id,
+                "length": size,
+                "chunkSize": chunk_size,
+                "uploadDate": datetime.now(timezone.utc),
+                "filename": filename,
+                "metadata": metadata
+            })
+        except BaseException:
+            await fs_chunks.delete_many({"files_id": file_id})
+            raise
+        return file_id, size
+
+def encode_page_cursor(sort_value: datetime, doc_id: str) -> str:
+    """Opaque cursor for the last document on a page, ordered by (sort_value, id)"""
+    return base64.urlsafe_b64encode(orjson.dumps([sort_value.isoformat(), doc_id])).decode()
+
+def keyset_filter(field: str, cursor: str, descending: bool) -> dict:
+    """Filter for the documents after a page cursor, so pages are found by index seek rather than skip"""
+    try:
+        sort_value, last_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        sort_value = datetime.fromisoformat(sort_value)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    op = "$lt" if descending else "$gt"
+    return {"$or": [{field: {op: sort_value}}, {field: sort_value, "id": {op: last_id}}]}
+
+def set_next_cursor(response: Response, items: List[dict], limit: int, field: str):
+    """Advertise the cursor for the next page when this page came back full"""
+    if items and len(items) == limit:
+        response.headers["X-Next-Cursor"] = encode_page_cursor(items[-1][field], items[-1]['id'])
+
+def active_subscription_filter(user_id: str, creator_id: str) -> dict:
+    """Query for a user's live (active and not yet expired) subscription to a creator"""
+    return {
+        "user_id": user_id,
+        "creator_id": creator_id,
+        "status": "active",
+        "expires_at": {"$gt": datetime.now(timezone.utc)}
+    }
 
 async def can_send_message(sender_id: str, recipient_id: str) -> tuple[bool, str]:
     """Check if sender can send message to recipient"""
@@ -454,7 +960,7 @@ async def can_send_message(sender_id: str, recipient_id: str) -> tuple[bool, str
         return False, "Conversation is blocked"
     
     # Check if recipient is a creator and has messaging restrictions
-    creator = await db.creators.find_one({"user_id": recipient_id})
+    creator = await db.creators.find_one({"user_id": recipient_id}, {"_id": 0, "id": 1})
     if creator:
         settings = await db.conversation_settings.find_one({"creator_id": creator['id']})
         if settings:
@@ -466,40 +972,99 @@ async def can_send_message(sender_id: str, recipient_id: str) -> tuple[bool, str
             
             if settings.get('require_subscription', False):
                 # Check if sender is subscribed
-                subscription = await db.subscriptions.find_one({
-                    "user_id": sender_id,
-                    "creator_id": creator['id'],
-                    "status": "active"
-                })
+                subscription = await db.subscriptions.find_one(
+                    active_subscription_filter(sender_id, creator['id']),
+                    {"_id": 1}
+                )
                 if not subscription:
                     return False, "Subscription required to send messages"
     
     return True, "OK"
 
+def auth_cache_key(token: str) -> bytes:
+    """Key used for a token in _auth_cache"""
+    return hashlib.sha256(token.encode()).digest()
+
+def remember_revoked_token(cache_key: bytes, expires_at: float):
+    """Record a revocation in this worker and drop the token from the auth cache"""
+    now = time.time()
+    # Forget revocations for tokens that have expired anyway
+    for key in [key for key, exp in _revoked_tokens.items() if exp <= now]:
+        del _revoked_tokens[key]
+    
+    _revoked_tokens[cache_key] = expires_at
+    _auth_cache.pop(cache_key, None)
+
+async def revoke_token(token: str, expires_at: float):
+    """Reject a token on every worker until its expiry"""
+    cache_key = auth_cache_key(token)
+    remember_revoked_token(cache_key, expires_at)
+    await db.revoked_tokens.update_one(
+        {"_id": cache_key},
+        {"$set": {"expires_at": datetime.fromtimestamp(expires_at, tz=timezone.utc)}},
+        upsert=True
+    )
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    cache_key = auth_cache_key(credentials.credentials)
+    if cache_key in _revoked_tokens:
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    
+    cached = _auth_cache.get(cache_key)
+    if cached is not None:
+        cached_user, expires_at = cached
+        # Never serve a token past its own expiry, even within the cache TTL
+        if expires_at > time.time():
+            return cached_user
+        _auth_cache.pop(cache_key, None)
+    
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = _jwt_decoder.decode(
+            credentials.credentials, _JWT_KEY_BYTES, algorithms=_JWT_ALGORITHMS, options=_JWT_DECODE_OPTIONS
+        )
         user_id: str = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid authentication")
         
-        user = await db.users.find_one({"id": user_id})
+        # Revocations may come from another worker, so check the shared list alongside the user lookup
+        user, revoked = await asyncio.gather(
+            db.users.find_one({"id": user_id}),
+            db.revoked_tokens.find_one({"_id": cache_key}, {"_id": 1})
+        )
+        if revoked:
+            remember_revoked_token(cache_key, payload["exp"])
+            raise HTTPException(status_code=401, detail="Token has been revoked")
         if user is None:
             raise HTTPException(status_code=401, detail="User not found")
-        return User(**user)
+        user_obj = User(**user)
+        _auth_cache[cache_key] = (user_obj, payload["exp"])
+        return user_obj
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication")
 
+async def get_current_creator_id(current_user: User = Depends(get_current_user)) -> str:
+    """Resolve the authenticated user's creator id, remembering it across requests"""
+    creator_id = _creator_id_cache.get(current_user.id)
+    if creator_id is None:
+        creator = await db.creators.find_one({"user_id": current_user.id}, {"_id": 0, "id": 1})
+        if not creator:
+            raise HTTPException(status_code=403, detail="User is not a creator")
+        creator_id = _creator_id_cache[current_user.id] = creator['id']
+    return creator_id
+
 # Auth Routes
 @api_router.post("/auth/register", response_model=dict)
 async def register(user_data: UserCreate):
-    # Check if user exists
-    existing_user = await db.users.find_one({"$or": [{"email": user_data.email}, {"username": user_data.username}]})
-    if existing_user:
+    # Check if user exists (two point lookups on the unique email/username indexes)
+    by_email, by_username = await asyncio.gather(
+        db.users.find_one({"email": user_data.email}, {"_id": 1}),
+        db.users.find_one({"username": user_data.username}, {"_id": 1})
+    )
+    if by_email or by_username:
         raise HTTPException(status_code=400, detail="User already exists")
     
     # Create user
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     user = User(**user_data.dict(), id=str(uuid.uuid4()))
     user_dict = user.dict()
     user_dict['password_hash'] = hashed_password
@@ -514,14 +1079,31 @@ async def register(user_data: UserCreate):
 @api_router.post("/auth/login", response_model=dict)
 async def login(user_data: UserLogin):
     user = await db.users.find_one({"email": user_data.email})
-    if not user or not verify_password(user_data.password, user['password_hash']):
+    if not user or not await verify_password(user_data.password, user['password_hash']):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
+    if password_needs_rehash(user['password_hash']):
+        await db.users.update_one(
+            {"id": user['id']},
+            {"$set": {"password_hash": await hash_password(user_data.password)}}
+        )
+    
     token = create_jwt_token({"sub": user['id']})
     user_obj = User(**{k: v for k, v in user.items() if k != 'password_hash'})
     
     return {"access_token": token, "token_type": "bearer", "user": user_obj}
 
+@api_router.post("/auth/logout")
+async def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: User = Depends(get_current_user)
+):
+    payload = _jwt_decoder.decode(
+        credentials.credentials, _JWT_KEY_BYTES, algorithms=_JWT_ALGORITHMS, options=_JWT_DECODE_OPTIONS
+    )
+    await revoke_token(credentials.credentials, payload["exp"])
+    return {"message": "Logged out successfully"}
+
 @api_router.get("/auth/me", response_model=User)
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
     return current_user
@@ -533,7 +1115,7 @@ async def create_creator_profile(creator_data: CreatorCreate, current_user: User
         raise HTTPException(status_code=403, detail="User is not registered as a creator")
     
     # Check if creator profile already exists
-    existing_creator = await db.creators.find_one({"user_id": current_user.id})
+    existing_creator = await db.creators.find_one({"user_id": current_user.id}, {"_id": 1})
     if existing_creator:
         raise HTTPException(status_code=400, detail="Creator profile already exists")
     
@@ -542,37 +1124,57 @@ async def create_creator_profile(creator_data: CreatorCreate, current_user: User
     
     return creator
 
+# Fields rendered on creator cards; profile-page fields are served by get_creator
+CREATOR_SUMMARY_PROJECTION = {
+    "_id": 0, "id": 1, "user_id": 1, "display_name": 1, "bio": 1, "category": 1, "tags": 1,
+    "subscription_price": 1, "follower_count": 1, "content_count": 1, "rating": 1,
+    "is_verified": 1, "banner_url": 1, "avatar_url": 1, "created_at": 1
+}
+USER_INFO_PROJECTION = {"_id": 0, "username": 1, "full_name": 1, "avatar_url": 1, "created_at": 1}
+
 @api_router.get("/creators", response_model=List[Dict])
 async def get_creators(skip: int = 0, limit: int = 20, category: Optional[str] = None, search: Optional[str] = None):
     filters = {}
+    projection = dict(CREATOR_SUMMARY_PROJECTION)
+    sort = None
     if category:
         filters["category"] = category
     if search:
+        search = search.strip()
+    if search and len(search) < MIN_TEXT_SEARCH_LENGTH:
+        # Too short for the text index to be useful; fall back to an anchored prefix match
         filters["$or"] = [
-            {"display_name": {"$regex": search, "$options": "i"}},
-            {"bio": {"$regex": search, "$options": "i"}},
-            {"tags": {"$in": [search]}}
+            {"display_name": {"$regex": f"^{re.escape(search)}", "$options": "i"}},
+            {"tags": search}
         ]
-        
-    creators = await db.creators.find(filters).skip(skip).limit(limit).to_list(length=None)
+    elif search:
+        filters["$text"] = {"$search": search}
+        projection["score"] = {"$meta": "textScore"}
+        sort = [("score", {"$meta": "textScore"})]
+    
+    cursor = db.creators.find(filters, projection)
+    if sort:
+        cursor = cursor.sort(sort)
+    creators = await cursor.skip(skip).limit(limit).to_list(length=None)
     
     # Enrich creators with user info
     enriched_creators = []
     for creator in creators:
-        user = await db.users.find_one({"id": creator['user_id']})
+        creator.pop('score', None)
+        user = await db.users.find_one({"id": creator['user_id']}, USER_INFO_PROJECTION)
         if user:
             enriched_creator = {
-                **serialize_doc(creator),
+                **creator,
                 "user_info": {
                     "username": user['username'],
                     "full_name": user['full_name'],
                     "avatar_url": user.get('avatar_url'),
-                    "created_at": user['created_at'].isoformat() if isinstance(user['created_at'], datetime) else user['created_at']
+                    "created_at": user['created_at']
                 }
             }
             enriched_creators.append(enriched_creator)
     
-    return enriched_creators
+    return MongoJSONResponse(enriched_creators)
 
 @api_router.get("/creators/{creator_id}", response_model=Dict)
 async def get_creator(creator_id: str):
@@ -588,51 +1190,51 @@ async def get_creator(creator_id: str):
     if not creator:
         raise HTTPException(status_code=404, detail="Creator not found")
     
-    # Get user info
-    user = await db.users.find_one({"id": creator['user_id']})
-    
-    # Get public content (free samples and previews)
-    public_content = await db.content.find({
-        "creator_id": creator['id'],
-        "is_premium": False,
-        "is_ppv": False
-    }).sort("created_at", -1).limit(10).to_list(length=None)
-    
-    # Get content statistics
-    content_stats = await db.content.aggregate([
-        {"$match": {"creator_id": creator['id']}},
-        {"$group": {
-            "_id": "$content_type",
-            "count": {"$sum": 1}
-        }}
-    ]).to_list(length=None)
-    
-    stats_dict = {stat['_id']: stat['count'] for stat in content_stats}
-    
-    # Get recent activity metrics
-    recent_content_count = await db.content.count_documents({
-        "creator_id": creator['id'],
-        "created_at": {"$gte": datetime.now(timezone.utc) - timedelta(days=30)}
-    })
-    
-    # Calculate total likes
-    total_likes = await db.content.aggregate([
-        {"$match": {"creator_id": creator['id']}},
-        {"$group": {"_id": None, "total_likes": {"$sum": "$likes"}}}
-    ]).to_list(1)
+    # Get user info alongside a single pass over the creator's content
+    user, content_facets = await asyncio.gather(
+        db.users.find_one({"id": creator['user_id']}),
+        db.content.aggregate([
+            {"$match": {"creator_id": creator['id']}},
+            {"$facet": {
+                # Get public content (free samples and previews)
+                "public_content": [
+                    {"$match": {"is_premium": False, "is_ppv": False}},
+                    {"$sort": {"created_at": -1}},
+                    {"$limit": 10}
+                ],
+                # Get content statistics
+                "content_stats": [
+                    {"$group": {"_id": "$content_type", "count": {"$sum": 1}}}
+                ],
+                # Get recent activity metrics
+                "recent_content": [
+                    {"$match": {"created_at": {"$gte": datetime.now(timezone.utc) - timedelta(days=30)}}},
+                    {"$count": "count"}
+                ],
+                # Calculate total likes
+                "total_likes": [
+                    {"$group": {"_id": None, "total_likes": {"$sum": "$likes"}}}
+                ]
+            }}
+        ]).to_list(1)
+    )
+    facets = content_facets[0]
     
-    total_likes_count = total_likes[0]['total_likes'] if total_likes else 0
+    public_content = facets['public_content']
+    stats_dict = {stat['_id']: stat['count'] for stat in facets['content_stats']}
+    recent_content_count = facets['recent_content'][0]['count'] if facets['recent_content'] else 0
+    total_likes_count = facets['total_likes'][0]['total_likes'] if facets['total_likes'] else 0
     
     # Enhanced creator response
     enhanced_creator = {
-        **serialize_doc(creator),
+        **creator,
         "user_info": {
             "username": user['username'],
             "full_name": user['full_name'],
             "avatar_url": user.get('avatar_url'),
-            "created_at": user['created_at'].isoformat() if isinstance(user['created_at'], datetime) else user['created_at']
+            "created_at": user['created_at']
         },
-        "public_content": [serialize_doc(content) for content in public_content],
+        "public_content": public_content,
         "content_stats": stats_dict,
         "recent_activity": {
             "posts_this_month": recent_content_count,
@@ -642,22 +1244,16 @@ async def get_creator(creator_id: str):
         "profile_completion": calculate_profile_completion(creator)
     }
     
-    return enhanced_creator
+    return MongoJSONResponse(enhanced_creator)
 
 def calculate_profile_completion(creator: dict) -> int:
     """Calculate profile completion percentage"""
-    fields = [
-        creator.get('display_name'),
-        creator.get('bio'),
-        creator.get('banner_url'),
-        creator.get('avatar_url'),
-        creator.get('welcome_message'),
-        creator.get('social_links'),
-        creator.get('tags')
-    ]
-    
-    completed = sum(1 for field in fields if field)
-    return int((completed / len(fields)) * 100)
+    get = creator.get
+    completed = (
+        bool(get('display_name')) + bool(get('bio')) + bool(get('banner_url')) + bool(get('avatar_url'))
+        + bool(get('welcome_message')) + bool(get('social_links')) + bool(get('tags'))
+    )
+    return completed * 100 // 7  # percentage of the 7 profile fields
 
 @api_router.put("/creators/{creator_id}")
 async def update_creator_profile(
@@ -666,7 +1262,7 @@ async def update_creator_profile(
     current_user: User = Depends(get_current_user)
 ):
     """Update creator profile"""
-    creator = await db.creators.find_one({"id": creator_id, "user_id": current_user.id})
+    creator = await db.creators.find_one({"id": creator_id, "user_id": current_user.id}, {"_id": 1})
     if not creator:
         raise HTTPException(status_code=404, detail="Creator not found or access denied")
     
@@ -687,7 +1283,7 @@ async def upload_creator_banner(
     current_user: User = Depends(get_current_user)
 ):
     """Upload creator banner image"""
-    creator = await db.creators.find_one({"id": creator_id, "user_id": current_user.id})
+    creator = await db.creators.find_one({"id": creator_id, "user_id": current_user.id}, {"_id": 1})
     if not creator:
         raise HTTPException(status_code=404, detail="Creator not found or access denied")
     
@@ -695,20 +1291,17 @@ async def upload_creator_banner(
     if not file.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="Only image files are allowed")
     
-    # Read and validate file size (max 5MB)
-    file_content = await file.read()
-    if len(file_content) > 5 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="File too large (max 5MB)")
-    
-    # Store file in GridFS
-    file_id = await fs.upload_from_stream(
+    # Store file in GridFS, validating file size (max 5MB) as it streams
+    file_id, _ = await upload_to_gridfs(
+        file,
         f"banner_{creator_id}_{file.filename}",
-        io.BytesIO(file_content),
         metadata={
             "content_type": file.content_type,
             "creator_id": creator_id,
             "type": "banner"
-        }
+        },
+        max_size=BANNER_MAX_SIZE,
+        too_large_detail="File too large (max 5MB)"
     )
     
     # Update creator with banner URL
@@ -721,19 +1314,19 @@ async def upload_creator_banner(
     return {"message": "Banner uploaded successfully", "banner_url": banner_url}
 
 @api_router.get("/creators/{creator_id}/banner/{file_id}")
-async def get_creator_banner(creator_id: str, file_id: str):
+async def get_creator_banner(creator_id: str, file_id: str, request: Request):
     """Get creator banner image"""
     try:
-        grid_out = await fs.open_download_stream(ObjectId(file_id))
-        file_data = await grid_out.read()
-        
-        return StreamingResponse(
-            io.BytesIO(file_data),
-            media_type=grid_out.metadata.get('content_type', 'image/jpeg'),
-            headers={"Cache-Control": "max-age=86400"}  # Cache for 24 hours
-        )
+        grid_out = await open_gridfs_file(ObjectId(file_id))
     except Exception:
         raise HTTPException(status_code=404, detail="Banner not found")
+    
+    return gridfs_streaming_response(
+        grid_out,
+        media_type=grid_out.metadata.get('content_type', 'image/jpeg'),
+        request=request,
+        headers={"Cache-Control": "max-age=86400"}  # Cache for 24 hours
+    )
 
 @api_router.post("/creators/{creator_id}/upload-welcome-video")
 async def upload_welcome_video(
@@ -742,7 +1335,7 @@ async def upload_welcome_video(
     current_user: User = Depends(get_current_user)
 ):
     """Upload creator welcome video"""
-    creator = await db.creators.find_one({"id": creator_id, "user_id": current_user.id})
+    creator = await db.creators.find_one({"id": creator_id, "user_id": current_user.id}, {"_id": 1})
     if not creator:
         raise HTTPException(status_code=404, detail="Creator not found or access denied")
     
@@ -750,20 +1343,17 @@ async def upload_welcome_video(
     if not file.content_type.startswith('video/'):
         raise HTTPException(status_code=400, detail="Only video files are allowed")
     
-    # Read and validate file size (max 50MB)
-    file_content = await file.read()
-    if len(file_content) > 50 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="File too large (max 50MB)")
-    
-    # Store file in GridFS
-    file_id = await fs.upload_from_stream(
+    # Store file in GridFS, validating file size (max 50MB) as it streams
+    file_id, _ = await upload_to_gridfs(
+        file,
         f"welcome_video_{creator_id}_{file.filename}",
-        io.BytesIO(file_content),
         metadata={
             "content_type": file.content_type,
             "creator_id": creator_id,
             "type": "welcome_video"
-        }
+        },
+        max_size=WELCOME_VIDEO_MAX_SIZE,
+        too_large_detail="File too large (max 50MB)"
     )
     
     # Update creator with video URL
@@ -776,19 +1366,19 @@ async def upload_welcome_video(
     return {"message": "Welcome video uploaded successfully", "video_url": video_url}
 
 @api_router.get("/creators/{creator_id}/welcome-video/{file_id}")
-async def get_welcome_video(creator_id: str, file_id: str):
+async def get_welcome_video(creator_id: str, file_id: str, request: Request):
     """Get creator welcome video"""
     try:
-        grid_out = await fs.open_download_stream(ObjectId(file_id))
-        file_data = await grid_out.read()
-        
-        return StreamingResponse(
-            io.BytesIO(file_data),
-            media_type=grid_out.metadata.get('content_type', 'video/mp4'),
-            headers={"Cache-Control": "max-age=3600"}  # Cache for 1 hour
-        )
+        grid_out = await open_gridfs_file(ObjectId(file_id))
     except Exception:
         raise HTTPException(status_code=404, detail="Welcome video not found")
+    
+    return gridfs_streaming_response(
+        grid_out,
+        media_type=grid_out.metadata.get('content_type', 'video/mp4'),
+        request=request,
+        headers={"Cache-Control": "max-age=3600"}  # Cache for 1 hour
+    )
 
 @api_router.get("/creators/{creator_id}/public-feed")
 async def get_creator_public_feed(
@@ -797,7 +1387,7 @@ async def get_creator_public_feed(
     limit: int = 20
 ):
     """Get creator's public feed with free samples"""
-    creator = await db.creators.find_one({"id": creator_id})
+    creator = await db.creators.find_one({"id": creator_id}, {"_id": 1})
     if not creator:
         raise HTTPException(status_code=404, detail="Creator not found")
     
@@ -823,12 +1413,12 @@ async def get_creator_public_feed(
         else:
             preview['preview_text'] = f"Vista previa - PPV ${ppv_price}"
     
-    return {
-        "public_content": [serialize_doc(content) for content in public_content],
-        "premium_previews": [serialize_doc(preview) for preview in premium_previews],
+    return MongoJSONResponse({
+        "public_content": public_content,
+        "premium_previews": premium_previews,
         "total_public": len(public_content),
         "has_premium": len(premium_previews) > 0
-    }
+    })
 
 # Content Routes
 @api_router.post("/content")
@@ -840,20 +1430,15 @@ async def create_content(
     ppv_price: Optional[float] = Form(None),
     tags: str = Form(""),
     file: Optional[UploadFile] = File(None),
-    current_user: User = Depends(get_current_user)
+    creator_id: str = Depends(get_current_creator_id)
 ):
-    # Get creator profile
-    creator = await db.creators.find_one({"user_id": current_user.id})
-    if not creator:
-        raise HTTPException(status_code=403, detail="User is not a creator")
-    
     content_data = {
         "title": title,
         "description": description,
         "is_premium": is_premium,
         "is_ppv": is_ppv,
         "ppv_price": ppv_price,
-        "tags": tags.split(",") if tags else []
+        "tags": parse_tags(tags)
     }
     
     file_path = None
@@ -861,53 +1446,97 @@ async def create_content(
     
     if file:
         # Store file in GridFS
-        file_content = await file.read()
-        file_id = await fs.upload_from_stream(
+        file_id, _ = await upload_to_gridfs(
+            file,
             file.filename,
-            io.BytesIO(file_content),
             metadata={"content_type": file.content_type}
         )
-        file_path = str(file_id)
+        file_path = file_id
         
-        # Determine content type
-        if file.content_type.startswith("image"):
-            content_type = "image"
-        elif file.content_type.startswith("video"):
-            content_type = "video"
-        elif file.content_type.startswith("audio"):
-            content_type = "audio"
+        content_type = classify_content_type(file.content_type)
     
     content = Content(
         **content_data,
-        creator_id=creator['id'],
+        creator_id=creator_id,
         content_type=content_type,
         file_path=file_path
     )
     
-    await db.content.insert_one(content.dict())
-    
-    # Update creator content count
-    await db.creators.update_one(
-        {"id": creator['id']},
-        {"$inc": {"content_count": 1}}
+    # Insert the content and bump the creator content count concurrently
+    await asyncio.gather(
+        db.content.insert_one(content.dict()),
+        db.creators.update_one(
+            {"id": creator_id},
+            {"$inc": {"content_count": 1}}
+        )
     )
     
     return {"message": "Content created successfully", "content_id": content.id}
 
 @api_router.get("/content", response_model=List[Content])
-async def get_content(skip: int = 0, limit: int = 20, creator_id: Optional[str] = None, category: Optional[str] = None):
+async def get_content(
+    response: Response,
+    skip: int = 0,
+    limit: int = 20,
+    creator_id: Optional[str] = None,
+    category: Optional[str] = None,
+    after: Optional[str] = None
+):
     filters = {}
     if creator_id:
         filters["creator_id"] = creator_id
-    
-    content = await db.content.find(filters).sort("created_at", -1).skip(skip).limit(limit).to_list(length=None)
-    return [Content(**item) for item in content]
+    # A cursor from X-Next-Cursor resumes by index seek; skip still works for offset paging
+    if after:
+        filters.update(keyset_filter("created_at", after, descending=True))
+    
+    cursor = db.content.find(filters, {"_id": 0}).sort([("created_at", -1), ("id", -1)])
+    if not after:
+        cursor = cursor.skip(skip)
+    content = await cursor.limit(limit).to_list(length=None)
+    set_next_cursor(response, content, limit, "created_at")
+    # Documents were validated on write; skip re-validating them on every read
+    return [Content.model_construct(**item) for item in content]
 
 @api_router.get("/content/{content_id}/file")
-async def get_content_file(content_id: str, current_user: User = Depends(get_current_user)):
-    content = await db.content.find_one({"id": content_id})
-    if not content:
+async def get_content_file(content_id: str, request: Request, current_user: User = Depends(get_current_user)):
+    # Fetch the content together with the caller's subscription and PPV payment in one round-trip
+    results = await db.content.aggregate([
+        {"$match": {"id": content_id}},
+        {"$limit": 1},
+        {"$project": {"_id": 0, "id": 1, "creator_id": 1, "is_premium": 1, "is_ppv": 1, "file_path": 1}},
+        {"$lookup": {
+            "from": "subscriptions",
+            "let": {"creator_id": "$creator_id"},
+            "pipeline": [
+                {"$match": {
+                    "user_id": current_user.id,
+                    "status": "active",
+                    "expires_at": {"$gt": datetime.now(timezone.utc)},
+                    "$expr": {"$eq": ["$creator_id", "$$creator_id"]}
+                }},
+                {"$limit": 1},
+                {"$project": {"_id": 1}}
+            ],
+            "as": "subscription"
+        }},
+        {"$lookup": {
+            "from": "payment_transactions",
+            "pipeline": [
+                {"$match": {
+                    "user_id": current_user.id,
+                    "metadata.content_id": content_id,
+                    "payment_status": "paid"
+                }},
+                {"$limit": 1},
+                {"$project": {"_id": 1}}
+            ],
+            "as": "payment"
+        }}
+    ]).to_list(1)
+    
+    if not results:
         raise HTTPException(status_code=404, detail="Content not found")
+    content = results[0]
     
     if not content.get('file_path'):
         raise HTTPException(status_code=404, detail="No file associated with this content")
@@ -915,35 +1544,24 @@ async def get_content_file(content_id: str, current_user: User = Depends(get_cur
     # Check access permissions
     if content['is_premium'] or content['is_ppv']:
         # Check if user has subscription or has paid for PPV
-        subscription = await db.subscriptions.find_one({
-            "user_id": current_user.id,
-            "creator_id": content['creator_id'],
-            "status": "active"
-        })
-        
-        if not subscription and content['is_ppv']:
-            # Check if user has paid for this specific content
-            payment = await db.payment_transactions.find_one({
-                "user_id": current_user.id,
-                "metadata.content_id": content_id,
-                "payment_status": "paid"
-            })
-            if not payment:
-                raise HTTPException(status_code=403, detail="Payment required to access this content")
+        if not content['subscription'] and content['is_ppv'] and not content['payment']:
+            raise HTTPException(status_code=403, detail="Payment required to access this content")
     
     # Get file from GridFS
     try:
-        file_id = ObjectId(content['file_path'])
-        grid_out = await fs.open_download_stream(file_id)
-        file_data = await grid_out.read()
-        
-        return StreamingResponse(
-            io.BytesIO(file_data),
-            media_type=grid_out.metadata.get('content_type', 'application/octet-stream'),
-            headers={"Content-Disposition": f"inline; filename={grid_out.filename}"}
-        )
-    except Exception as e:
+        file_id = content['file_path']
+        if isinstance(file_id, str):
+            file_id = ObjectId(file_id)
+        grid_out = await open_gridfs_file(file_id)
+    except Exception:
         raise HTTPException(status_code=404, detail="File not found")
+    
+    return gridfs_streaming_response(
+        grid_out,
+        media_type=grid_out.metadata.get('content_type', 'application/octet-stream'),
+        request=request,
+        headers={"Content-Disposition": f"inline; filename={grid_out.filename}"}
+    )
 
 # Scheduled Content Routes
 @api_router.post("/content/schedule")
@@ -959,15 +1577,10 @@ async def schedule_content(
     recurrence_type: Optional[str] = Form(None),
     recurrence_end_date: Optional[str] = Form(None),
     file: Optional[UploadFile] = File(None),
-    current_user: User = Depends(get_current_user)
+    creator_id: str = Depends(get_current_creator_id)
 ):
-    # Get creator profile
-    creator = await db.creators.find_one({"user_id": current_user.id})
-    if not creator:
-        raise HTTPException(status_code=403, detail="User is not a creator")
-    
     try:
-        scheduled_datetime = datetime.fromisoformat(scheduled_date.replace('Z', '+00:00'))
+        scheduled_datetime = parse_iso_datetime(scheduled_date)
         if scheduled_datetime <= datetime.now(timezone.utc):
             raise HTTPException(status_code=400, detail="Scheduled date must be in the future")
     except ValueError:
@@ -978,32 +1591,25 @@ async def schedule_content(
     
     if file:
         # Store file in GridFS
-        file_content = await file.read()
-        file_id = await fs.upload_from_stream(
+        file_id, _ = await upload_to_gridfs(
+            file,
             file.filename,
-            io.BytesIO(file_content),
             metadata={"content_type": file.content_type}
         )
-        file_path = str(file_id)
+        file_path = file_id
         
-        # Determine content type
-        if file.content_type.startswith("image"):
-            content_type = "image"
-        elif file.content_type.startswith("video"):
-            content_type = "video"
-        elif file.content_type.startswith("audio"):
-            content_type = "audio"
+        content_type = classify_content_type(file.content_type)
     
     # Parse recurrence end date if provided
     recurrence_end_datetime = None
     if recurrence_end_date:
         try:
-            recurrence_end_datetime = datetime.fromisoformat(recurrence_end_date.replace('Z', '+00:00'))
+            recurrence_end_datetime = parse_iso_datetime(recurrence_end_date)
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid recurrence end date format")
     
     scheduled_content = ScheduledContent(
-        creator_id=creator['id'],
+        creator_id=creator_id,
         title=title,
         description=description,
         content_type=content_type,
@@ -1011,7 +1617,7 @@ async def schedule_content(
         is_premium=is_premium,
         is_ppv=is_ppv,
         ppv_price=ppv_price,
-        tags=tags.split(",") if tags else [],
+        tags=parse_tags(tags),
         scheduled_date=scheduled_datetime,
         is_recurring=is_recurring,
         recurrence_type=recurrence_type,
@@ -1019,49 +1625,53 @@ async def schedule_content(
     )
     
     await db.scheduled_content.insert_one(scheduled_content.dict())
+    _scheduler_wakeup.set()
     
     return {"message": "Content scheduled successfully", "scheduled_content_id": scheduled_content.id}
 
 @api_router.get("/content/scheduled", response_model=List[ScheduledContent])
 async def get_scheduled_content(
+    response: Response,
     skip: int = 0, 
     limit: int = 50,
     status: Optional[str] = None,
-    current_user: User = Depends(get_current_user)
+    after: Optional[str] = None,
+    creator_id: str = Depends(get_current_creator_id)
 ):
-    creator = await db.creators.find_one({"user_id": current_user.id})
-    if not creator:
-        raise HTTPException(status_code=403, detail="User is not a creator")
-    
-    filters = {"creator_id": creator['id']}
+    # Items the publisher has claimed are mid-write and can no longer be changed, so they aren't listed
+    filters = {"creator_id": creator_id, "status": {"$ne": "publishing"}}
     if status:
-        filters["status"] = status
+        filters["status"]["$eq"] = status
+    if after:
+        filters.update(keyset_filter("scheduled_date", after, descending=False))
     
-    scheduled_content = await db.scheduled_content.find(filters).sort("scheduled_date", 1).skip(skip).limit(limit).to_list(length=None)
-    return [ScheduledContent(**item) for item in scheduled_content]
+    cursor = db.scheduled_content.find(filters).sort([("scheduled_date", 1), ("id", 1)])
+    if not after:
+        cursor = cursor.skip(skip)
+    scheduled_content = await cursor.limit(limit).to_list(length=None)
+    set_next_cursor(response, scheduled_content, limit, "scheduled_date")
+    return [ScheduledContent.model_construct(**item) for item in scheduled_content]
 
 @api_router.delete("/content/scheduled/{scheduled_id}")
-async def cancel_scheduled_content(scheduled_id: str, current_user: User = Depends(get_current_user)):
-    creator = await db.creators.find_one({"user_id": current_user.id})
-    if not creator:
-        raise HTTPException(status_code=403, detail="User is not a creator")
-    
-    scheduled_content = await db.scheduled_content.find_one({
-        "id": scheduled_id,
-        "creator_id": creator['id']
-    })
-    
-    if not scheduled_content:
-        raise HTTPException(status_code=404, detail="Scheduled content not found")
-    
-    if scheduled_content['status'] == 'published':
-        raise HTTPException(status_code=400, detail="Cannot cancel already published content")
-    
-    await db.scheduled_content.update_one(
-        {"id": scheduled_id},
+async def cancel_scheduled_content(scheduled_id: str, creator_id: str = Depends(get_current_creator_id)):
+    # Guarded update: one round-trip when it succeeds, a lookup only to explain a refusal.
+    # Claimed ("publishing") items are refused too, since the publisher will insert them regardless
+    result = await db.scheduled_content.update_one(
+        {"id": scheduled_id, "creator_id": creator_id, "status": {"$nin": ["published", "publishing"]}},
         {"$set": {"status": "cancelled"}}
     )
     
+    if result.matched_count == 0:
+        scheduled_content = await db.scheduled_content.find_one(
+            {"id": scheduled_id, "creator_id": creator_id},
+            {"_id": 0, "status": 1}
+        )
+        if not scheduled_content:
+            raise HTTPException(status_code=404, detail="Scheduled content not found")
+        if scheduled_content.get("status") == "publishing":
+            raise HTTPException(status_code=400, detail="Cannot cancel content that is being published")
+        raise HTTPException(status_code=400, detail="Cannot cancel already published content")
+    
     return {"message": "Scheduled content cancelled successfully"}
 
 @api_router.put("/content/scheduled/{scheduled_id}")
@@ -1074,15 +1684,11 @@ async def update_scheduled_content(
     is_ppv: Optional[bool] = Form(None),
     ppv_price: Optional[float] = Form(None),
     tags: Optional[str] = Form(None),
-    current_user: User = Depends(get_current_user)
+    creator_id: str = Depends(get_current_creator_id)
 ):
-    creator = await db.creators.find_one({"user_id": current_user.id})
-    if not creator:
-        raise HTTPException(status_code=403, detail="User is not a creator")
-    
     scheduled_content = await db.scheduled_content.find_one({
         "id": scheduled_id,
-        "creator_id": creator['id'],
+        "creator_id": creator_id,
         "status": "scheduled"
     })
     
@@ -1097,7 +1703,7 @@ async def update_scheduled_content(
         update_data["description"] = description
     if scheduled_date is not None:
         try:
-            scheduled_datetime = datetime.fromisoformat(scheduled_date.replace('Z', '+00:00'))
+            scheduled_datetime = parse_iso_datetime(scheduled_date)
             if scheduled_datetime <= datetime.now(timezone.utc):
                 raise HTTPException(status_code=400, detail="Scheduled date must be in the future")
             update_data["scheduled_date"] = scheduled_datetime
@@ -1110,46 +1716,39 @@ async def update_scheduled_content(
     if ppv_price is not None:
         update_data["ppv_price"] = ppv_price
     if tags is not None:
-        update_data["tags"] = tags.split(",") if tags else []
+        update_data["tags"] = parse_tags(tags)
     
     if update_data:
-        await db.scheduled_content.update_one(
-            {"id": scheduled_id},
+        # Same status guard as the lookup, so an edit racing the publisher's claim is dropped
+        result = await db.scheduled_content.update_one(
+            {"id": scheduled_id, "status": "scheduled"},
             {"$set": update_data}
         )
+        if result.matched_count == 0:
+            raise HTTPException(status_code=404, detail="Scheduled content not found or already published")
+        if "scheduled_date" in update_data:
+            _scheduler_wakeup.set()
     
     return {"message": "Scheduled content updated successfully"}
 
 # Content Templates Routes
 @api_router.post("/content/templates", response_model=ContentTemplate)
-async def create_content_template(template_data: ContentTemplateCreate, current_user: User = Depends(get_current_user)):
-    creator = await db.creators.find_one({"user_id": current_user.id})
-    if not creator:
-        raise HTTPException(status_code=403, detail="User is not a creator")
-    
-    template = ContentTemplate(**template_data.dict(), creator_id=creator['id'])
+async def create_content_template(template_data: ContentTemplateCreate, creator_id: str = Depends(get_current_creator_id)):
+    template = ContentTemplate(**template_data.dict(), creator_id=creator_id)
     await db.content_templates.insert_one(template.dict())
     
     return template
 
 @api_router.get("/content/templates", response_model=List[ContentTemplate])
-async def get_content_templates(current_user: User = Depends(get_current_user)):
-    creator = await db.creators.find_one({"user_id": current_user.id})
-    if not creator:
-        raise HTTPException(status_code=403, detail="User is not a creator")
-    
-    templates = await db.content_templates.find({"creator_id": creator['id']}).to_list(length=None)
-    return [ContentTemplate(**template) for template in templates]
+async def get_content_templates(creator_id: str = Depends(get_current_creator_id)):
+    templates = await db.content_templates.find({"creator_id": creator_id}).to_list(length=None)
+    return [ContentTemplate.model_construct(**template) for template in templates]
 
 @api_router.delete("/content/templates/{template_id}")
-async def delete_content_template(template_id: str, current_user: User = Depends(get_current_user)):
-    creator = await db.creators.find_one({"user_id": current_user.id})
-    if not creator:
-        raise HTTPException(status_code=403, detail="User is not a creator")
-    
+async def delete_content_template(template_id: str, creator_id: str = Depends(get_current_creator_id)):
     result = await db.content_templates.delete_one({
         "id": template_id,
-        "creator_id": creator['id']
+        "creator_id": creator_id
     })
     
     if result.deleted_count == 0:
@@ -1157,58 +1756,78 @@ async def delete_content_template(template_id: str, current_user: User = Depends
     
     return {"message": "Template deleted successfully"}
 
-# Auto-publish scheduled content (this would be called by a cron job)
+# Auto-publish scheduled content (run by scheduled_publisher_loop; the endpoint remains for manual/cron runs)
 @api_router.post("/content/publish-scheduled")
 async def publish_scheduled_content():
     """
-    This endpoint should be called periodically by a cron job to publish scheduled content
+    Publish any scheduled content that is already due
     """
+    count = await publish_due_scheduled_content()
+    return {"message": f"Published {count} scheduled content items"}
+
+async def publish_due_scheduled_content() -> int:
+    """Publish every due scheduled item and return how many were published"""
     current_time = datetime.now(timezone.utc)
     
-    # Find content that should be published now
+    # Claim the due items first: every worker runs the publisher, and each item must publish once.
+    # Claims whose lease ran out (or that predate claimed_at) are taken over
+    claim_id = str(uuid.uuid4())
+    stale_before = current_time - timedelta(seconds=SCHEDULER_CLAIM_LEASE_SECONDS)
+    await db.scheduled_content.update_many(
+        {"$or": [
+            {"status": "scheduled", "scheduled_date": {"$lte": current_time}},
+            {"status": "publishing", "claimed_at": {"$not": {"$gte": stale_before}}}
+        ]},
+        {"$set": {"status": "publishing", "claim_id": claim_id, "claimed_at": current_time}}
+    )
+    try:
+        return await publish_claimed_scheduled_content(claim_id, current_time)
+    except Exception:
+        # Hand our claim back so the next run retries it instead of waiting out the lease
+        await db.scheduled_content.update_many(
+            {"status": "publishing", "claim_id": claim_id},
+            {"$set": {"status": "scheduled"}, "$unset": {"claim_id": "", "claimed_at": ""}}
+        )
+        raise
+
+async def publish_claimed_scheduled_content(claim_id: str, current_time: datetime) -> int:
+    """Publish the items held by claim_id; safe to re-run after a partial failure.
+    
+    Published content takes the scheduled item's id and each recurrence gets an id derived
+    from it, so documents already written by an earlier attempt are skipped, not duplicated.
+    """
     scheduled_content = await db.scheduled_content.find({
-        "scheduled_date": {"$lte": current_time},
-        "status": "scheduled"
+        "status": "publishing",
+        "claim_id": claim_id
     }).to_list(length=None)
     
-    published_count = 0
+    # Build every write up front, then send each collection's writes as one batch
+    published = []
+    content_docs = []
+    failures = []  # (scheduled id, reason), logged once after the batch
     
     for content_data in scheduled_content:
         try:
-            # Create the actual content
-            content = Content(
-                creator_id=content_data['creator_id'],
-                title=content_data['title'],
-                description=content_data['description'],
-                content_type=content_data['content_type'],
-                file_path=content_data.get('file_path'),
-                thumbnail_url=content_data.get('thumbnail_url'),
-                is_premium=content_data['is_premium'],
-                is_ppv=content_data['is_ppv'],
-                ppv_price=content_data.get('ppv_price'),
-                tags=content_data['tags']
-            )
-            
-            await db.content.insert_one(content.dict())
-            
-            # Update scheduled content status
-            await db.scheduled_content.update_one(
-                {"id": content_data['id']},
-                {
-                    "$set": {
-                        "status": "published",
-                        "published_at": current_time
-                    }
-                }
-            )
-            
-            # Update creator content count
-            await db.creators.update_one(
-                {"id": content_data['creator_id']},
-                {"$inc": {"content_count": 1}}
-            )
+            # Raw documents with current_time set once; same fields and defaults as Content/ScheduledContent
+            content = {
+                "id": content_data['id'],
+                "creator_id": content_data['creator_id'],
+                "title": content_data['title'],
+                "description": content_data['description'],
+                "content_type": content_data['content_type'],
+                "file_path": content_data.get('file_path'),
+                "thumbnail_url": content_data.get('thumbnail_url'),
+                "is_premium": content_data['is_premium'],
+                "is_ppv": content_data['is_ppv'],
+                "ppv_price": content_data.get('ppv_price'),
+                "tags": content_data['tags'],
+                "likes": 0,
+                "views": 0,
+                "created_at": current_time
+            }
             
             # Handle recurring content
+            next_scheduled = None
             if content_data.get('is_recurring') and content_data.get('recurrence_type'):
                 next_date = calculate_next_recurrence_date(
                     content_data['scheduled_date'], 
@@ -1219,65 +1838,128 @@ async def publish_scheduled_content():
                 if (not content_data.get('recurrence_end_date') or 
                     next_date <= content_data['recurrence_end_date']):
                     
-                    next_scheduled = ScheduledContent(
-                        creator_id=content_data['creator_id'],
-                        title=content_data['title'],
-                        description=content_data['description'],
-                        content_type=content_data['content_type'],
-                        file_path=content_data.get('file_path'),
-                        is_premium=content_data['is_premium'],
-                        is_ppv=content_data['is_ppv'],
-                        ppv_price=content_data.get('ppv_price'),
-                        tags=content_data['tags'],
-                        scheduled_date=next_date,
-                        is_recurring=True,
-                        recurrence_type=content_data['recurrence_type'],
-                        recurrence_end_date=content_data.get('recurrence_end_date')
-                    )
-                    
-                    await db.scheduled_content.insert_one(next_scheduled.dict())
+                    next_scheduled = {
+                        "id": str(uuid.uuid5(RECURRENCE_ID_NAMESPACE, content_data['id'])),
+                        "creator_id": content_data['creator_id'],
+                        "title": content_data['title'],
+                        "description": content_data['description'],
+                        "content_type": content_data['content_type'],
+                        "file_path": content_data.get('file_path'),
+                        "thumbnail_url": None,
+                        "is_premium": content_data['is_premium'],
+                        "is_ppv": content_data['is_ppv'],
+                        "ppv_price": content_data.get('ppv_price'),
+                        "tags": content_data['tags'],
+                        "scheduled_date": next_date,
+                        "is_recurring": True,
+                        "recurrence_type": content_data['recurrence_type'],
+                        "recurrence_end_date": content_data.get('recurrence_end_date'),
+                        "status": "scheduled",
+                        "created_at": current_time,
+                        "published_at": None
+                    }
             
-            published_count += 1
+            published.append((content_data, next_scheduled))
+            content_docs.append(content)
             
         except Exception as e:
-            logging.error(f"Error publishing scheduled content {content_data['id']}: {str(e)}")
-            # Mark as failed
-            await db.scheduled_content.update_one(
-                {"id": content_data['id']},
-                {"$set": {"status": "failed"}}
-            )
+            failures.append((content_data.get('id'), repr(e)))
     
-    return {"message": f"Published {published_count} scheduled content items"}
+    # Only items whose content document was actually written count as published. A duplicate id
+    # means an earlier attempt already wrote it: still published, but its count was already bumped
+    already_published = set()
+    if content_docs:
+        try:
+            await db.content.insert_many(content_docs, ordered=False)
+        except BulkWriteError as e:
+            failed = {}
+            for error in e.details.get('writeErrors', []):
+                if error.get('code') == 11000:
+                    already_published.add(published[error['index']][0]['id'])
+                else:
+                    failed[error['index']] = error.get('errmsg', '')
+            failures.extend((published[index][0]['id'], failed[index]) for index in sorted(failed))
+            published = [item for index, item in enumerate(published) if index not in failed]
+    
+    content_counts = Counter(
+        content_data['creator_id'] for content_data, _ in published
+        if content_data['id'] not in already_published
+    )
+    recurring_docs = [next_scheduled for _, next_scheduled in published if next_scheduled]
+    
+    writes = []
+    if published:
+        writes.append(db.scheduled_content.update_many(
+            {"id": {"$in": [content_data['id'] for content_data, _ in published]}},
+            {"$set": {"status": "published", "published_at": current_time}}
+        ))
+    if content_counts:
+        writes.append(db.creators.bulk_write([
+            UpdateOne({"id": creator_id}, {"$inc": {"content_count": count}})
+            for creator_id, count in content_counts.items()
+        ], ordered=False))
+    if recurring_docs:
+        writes.append(insert_many_skipping_duplicates(db.scheduled_content, recurring_docs))
+    if failures:
+        logger.error(
+            "Failed to publish %d scheduled content items (first %d: %s)",
+            len(failures), min(len(failures), 10), failures[:10]
+        )
+        writes.append(db.scheduled_content.update_many(
+            {"id": {"$in": [scheduled_id for scheduled_id, _ in failures]}},
+            {"$set": {"status": "failed"}}
+        ))
+    await asyncio.gather(*writes)
+    if recurring_docs:
+        _scheduler_wakeup.set()
+    
+    return len(published)
+
+async def insert_many_skipping_duplicates(collection, docs: List[dict]):
+    """insert_many that treats documents already present (duplicate key) as written"""
+    try:
+        await collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+            raise
+
+async def seconds_until_next_scheduled() -> float:
+    """Delay until the earliest scheduled item is due, capped at SCHEDULER_MAX_SLEEP_SECONDS"""
+    # Served from the (status, scheduled_date) index: one key read, not a scan
+    next_item = await db.scheduled_content.find_one(
+        {"status": "scheduled"},
+        {"_id": 0, "scheduled_date": 1},
+        sort=[("scheduled_date", 1)]
+    )
+    if not next_item:
+        return SCHEDULER_MAX_SLEEP_SECONDS
+    # Mongo hands back naive UTC datetimes
+    due = next_item['scheduled_date'].replace(tzinfo=timezone.utc)
+    delay = (due - datetime.now(timezone.utc)).total_seconds()
+    return min(max(delay, 0), SCHEDULER_MAX_SLEEP_SECONDS)
+
+async def scheduled_publisher_loop():
+    """Publish scheduled content as it falls due, waking early when a schedule changes"""
+    while True:
+        # Cleared before reading the next due time so a schedule written meanwhile still wakes us
+        _scheduler_wakeup.clear()
+        try:
+            count = await publish_due_scheduled_content()
+            if count:
+                logger.info("Published %d scheduled content items", count)
+            delay = await seconds_until_next_scheduled()
+        except Exception:
+            logger.exception("Scheduled content publisher failed")
+            delay = SCHEDULER_ERROR_RETRY_SECONDS
+        try:
+            await asyncio.wait_for(_scheduler_wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
 
 def calculate_next_recurrence_date(current_date: datetime, recurrence_type: str) -> datetime:
     """Calculate the next occurrence date based on recurrence type"""
-    if isinstance(current_date, str):
-        current_date = datetime.fromisoformat(current_date.replace('Z', '+00:00'))
-    
-    if recurrence_type == 'daily':
-        return current_date + timedelta(days=1)
-    elif recurrence_type == 'weekly':
-        return current_date + timedelta(weeks=1)
-    elif recurrence_type == 'monthly':
-        # Add one month (approximate)
-        if current_date.month == 12:
-            return current_date.replace(year=current_date.year + 1, month=1)
-        else:
-            try:
-                return current_date.replace(month=current_date.month + 1)
-            except ValueError:
-                # Handle case where day doesn't exist in next month (e.g., Jan 31 -> Feb 28)
-                import calendar
-                next_month = current_date.month + 1 if current_date.month < 12 else 1
-                next_year = current_date.year if current_date.month < 12 else current_date.year + 1
-                max_day = calendar.monthrange(next_year, next_month)[1]
-                return current_date.replace(
-                    year=next_year,
-                    month=next_month,
-                    day=min(current_date.day, max_day)
-                )
-    else:
-        return current_date + timedelta(days=1)  # Default to daily
+    # relativedelta clamps month-end dates (e.g., Jan 31 -> Feb 28); unknown types default to daily
+    return current_date + RECURRENCE_INTERVALS.get(recurrence_type, RECURRENCE_INTERVALS['daily'])
 
 # Payment Routes
 @api_router.post("/payments/subscribe")
@@ -1289,23 +1971,25 @@ async def create_subscription_checkout(
     if subscription_data.plan_type not in SUBSCRIPTION_PACKAGES:
         raise HTTPException(status_code=400, detail="Invalid subscription plan")
     
-    creator = await db.creators.find_one({"id": subscription_data.creator_id})
+    # Look up the creator and any existing subscription concurrently
+    creator, existing_subscription = await asyncio.gather(
+        db.creators.find_one({"id": subscription_data.creator_id}, {"_id": 1}),
+        db.subscriptions.find_one(
+            active_subscription_filter(current_user.id, subscription_data.creator_id),
+            {"_id": 1}
+        )
+    )
     if not creator:
         raise HTTPException(status_code=404, detail="Creator not found")
     
     # Check if already subscribed
-    existing_subscription = await db.subscriptions.find_one({
-        "user_id": current_user.id,
-        "creator_id": subscription_data.creator_id,
-        "status": "active"
-    })
     if existing_subscription:
         raise HTTPException(status_code=400, detail="Already subscribed to this creator")
     
     # Create Stripe checkout session
-    host_url = str(request.base_url).rstrip('/')
+    host_url = get_public_base_url(request)
     webhook_url = f"{host_url}/api/webhook/stripe"
-    stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
+    stripe_checkout = get_stripe_checkout(webhook_url)
     
     package = SUBSCRIPTION_PACKAGES[subscription_data.plan_type]
     success_url = f"{host_url}/subscription-success?session_id={{CHECKOUT_SESSION_ID}}"
@@ -1348,17 +2032,18 @@ async def create_tip_checkout(
     request: Request,
     current_user: User = Depends(get_current_user)
 ):
-    creator = await db.creators.find_one({"id": tip_data.creator_id})
-    if not creator:
-        raise HTTPException(status_code=404, detail="Creator not found")
-    
+    # Validate the amount before touching the database
     if tip_data.amount < 1.0:
         raise HTTPException(status_code=400, detail="Minimum tip amount is $1.00")
     
+    creator = await db.creators.find_one({"id": tip_data.creator_id}, {"_id": 1})
+    if not creator:
+        raise HTTPException(status_code=404, detail="Creator not found")
+    
     # Create Stripe checkout session
-    host_url = str(request.base_url).rstrip('/')
+    host_url = get_public_base_url(request)
     webhook_url = f"{host_url}/api/webhook/stripe"
-    stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
+    stripe_checkout = get_stripe_checkout(webhook_url)
     
     success_url = f"{host_url}/tip-success?session_id={{CHECKOUT_SESSION_ID}}"
     cancel_url = f"{host_url}/creators/{tip_data.creator_id}"
@@ -1397,24 +2082,23 @@ async def create_tip_checkout(
 @api_router.get("/payments/status/{session_id}")
 async def get_payment_status(session_id: str, current_user: User = Depends(get_current_user)):
     # Get payment transaction
-    transaction = await db.payment_transactions.find_one({"stripe_session_id": session_id})
+    transaction = await db.payment_transactions.find_one(
+        {"stripe_session_id": session_id},
+        {"_id": 0, "payment_status": 1}
+    )
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
     # Check Stripe status
-    stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url="")
+    stripe_checkout = get_stripe_checkout("")
     status_response = await stripe_checkout.get_checkout_status(session_id)
     
     # Update transaction status if changed
     if status_response.payment_status != transaction['payment_status']:
-        await db.payment_transactions.update_one(
-            {"stripe_session_id": session_id},
-            {"$set": {"payment_status": status_response.payment_status}}
-        )
-        
-        # Process successful payment
-        if status_response.payment_status == "paid" and transaction['payment_status'] != "paid":
-            await process_successful_payment(transaction, status_response.metadata)
+        # Only the caller that flips the status processes the payment (webhook may race us)
+        previous_transaction = await update_transaction_status(session_id, status_response.payment_status)
+        if previous_transaction and status_response.payment_status == "paid":
+            await process_successful_payment(previous_transaction, status_response.metadata)
     
     return {
         "payment_status": status_response.payment_status,
@@ -1422,7 +2106,20 @@ async def get_payment_status(session_id: str, current_user: User = Depends(get_c
         "currency": status_response.currency
     }
 
+async def update_transaction_status(session_id: str, payment_status: str) -> Optional[dict]:
+    """Atomically move a transaction to a new payment status.
+    
+    Returns the transaction as it was before the change, or None if it already had that
+    status or is already paid (paid transactions are never moved back).
+    """
+    return await db.payment_transactions.find_one_and_update(
+        {"stripe_session_id": session_id, "payment_status": {"$nin": ["paid", payment_status]}},
+        {"$set": {"payment_status": payment_status}}
+    )
+
 async def process_successful_payment(transaction: dict, metadata: dict):
+    counters = {"total_revenue": transaction['amount']}
+    
     if transaction['transaction_type'] == 'subscription':
         # Create subscription
         expires_at = datetime.now(timezone.utc) + timedelta(days=30)
@@ -1433,93 +2130,141 @@ async def process_successful_payment(transaction: dict, metadata: dict):
             status="active",
             expires_at=expires_at
         )
-        await db.subscriptions.insert_one(subscription.dict())
-        
-        # Update creator follower count
+        # Retire lapsed subscriptions so they don't collide with the new active one
+        retired = await db.subscriptions.update_many(
+            {
+                "user_id": transaction['user_id'],
+                "creator_id": transaction['creator_id'],
+                "status": "active",
+                "expires_at": {"$lte": datetime.now(timezone.utc)}
+            },
+            {"$set": {"status": "expired"}}
+        )
+        counters["subscriber_count"] = -retired.modified_count
+        try:
+            await db.subscriptions.insert_one(subscription.dict())
+            counters["follower_count"] = 1
+            counters["subscriber_count"] += 1
+        except DuplicateKeyError:
+            # Already has an active subscription to this creator
+            pass
+    
+    # Keep the creator's dashboard counters in step with the payment
+    if transaction.get('creator_id'):
         await db.creators.update_one(
             {"id": transaction['creator_id']},
-            {"$inc": {"follower_count": 1}}
+            {"$inc": counters}
         )
 
+async def count_active_subscribers(creator_id: str) -> int:
+    """Count a creator's active, unexpired subscriptions (a range count on the partial expires_at index)"""
+    return await db.subscriptions.count_documents({
+        "creator_id": creator_id,
+        "status": "active",
+        "expires_at": {"$gt": datetime.now(timezone.utc)}
+    })
+
+async def reconcile_creator_stats(creator_id: str) -> dict:
+    """Recompute a creator's stored subscriber/revenue counters from source collections"""
+    # Different collections, so no single $facet; run both queries concurrently instead
+    total_subscribers, total_revenue = await asyncio.gather(
+        count_active_subscribers(creator_id),
+        db.payment_transactions.aggregate([
+            {"$match": {
+                "creator_id": creator_id,
+                "payment_status": "paid"
+            }},
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": "$amount"}
+            }}
+        ]).to_list(1)
+    )
+    
+    stats = {
+        "subscriber_count": total_subscribers,
+        "total_revenue": total_revenue[0]['total'] if total_revenue else 0,
+        "stats_reconciled_at": datetime.now(timezone.utc)
+    }
+    await db.creators.update_one({"id": creator_id}, {"$set": stats})
+    return stats
+
 @api_router.post("/webhook/stripe")
 async def stripe_webhook(request: Request):
     body = await request.body()
     signature = request.headers.get("Stripe-Signature")
     
     try:
-        stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url="")
+        stripe_checkout = get_stripe_checkout("")
         webhook_response = await stripe_checkout.handle_webhook(body, signature)
         
         # Process webhook event
         if webhook_response.event_type == "checkout.session.completed":
-            transaction = await db.payment_transactions.find_one({
-                "stripe_session_id": webhook_response.session_id
-            })
-            
-            if transaction and transaction['payment_status'] != "paid":
-                await db.payment_transactions.update_one(
-                    {"stripe_session_id": webhook_response.session_id},
-                    {"$set": {"payment_status": "paid"}}
-                )
-                
+            transaction = await update_transaction_status(webhook_response.session_id, "paid")
+            if transaction:
                 await process_successful_payment(transaction, webhook_response.metadata)
         
         return {"status": "success"}
     except Exception as e:
-        logging.error(f"Webhook error: {str(e)}")
+        logger.exception("Webhook error: %s", e)
         raise HTTPException(status_code=400, detail="Webhook processing failed")
 
 # Messaging Routes
 @api_router.get("/conversations", response_model=List[Dict])
 async def get_conversations(current_user: User = Depends(get_current_user)):
     """Get all conversations for the current user"""
-    conversations = await db.conversations.find({
-        "$or": [
-            {"creator_id": current_user.id},
-            {"fan_id": current_user.id}
-        ]
-    }).sort("last_message_at", -1).to_list(length=None)
+    # Last message and unread counts live on the conversation; only participant info is joined
+    conversations = await db.conversations.aggregate([
+        {"$match": {
+            "$or": [
+                {"creator_id": current_user.id},
+                {"fan_id": current_user.id}
+            ]
+        }},
+        {"$sort": {"last_message_at": -1}},
+        {"$project": {"_id": 0}},
+        {"$lookup": {
+            "from": "users",
+            "let": {
+                "other_user_id": {"$cond": [{"$eq": ["$creator_id", current_user.id]}, "$fan_id", "$creator_id"]}
+            },
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$id", "$$other_user_id"]}}},
+                {"$limit": 1},
+                {"$project": {"_id": 0, "id": 1, "username": 1, "full_name": 1, "avatar_url": 1, "is_creator": 1}}
+            ],
+            "as": "other_user"
+        }},
+        {"$unwind": "$other_user"},
+        {"$lookup": {
+            "from": "creators",
+            "let": {"creator_id": "$creator_id"},
+            "pipeline": [
+                # Only the fan side gets the creator's profile
+                {"$match": {"$expr": {"$and": [
+                    {"$eq": ["$user_id", "$$creator_id"]},
+                    {"$ne": ["$$creator_id", current_user.id]}
+                ]}}},
+                {"$limit": 1},
+                {"$project": {"_id": 0}}
+            ],
+            "as": "creator_info"
+        }},
+        {"$addFields": {
+            "creator_info": {"$ifNull": [{"$arrayElemAt": ["$creator_info", 0]}, None]}
+        }}
+    ]).to_list(length=None)
+    
+    # Conversations created before the summaries were stored get them derived once
+    legacy_conversations = [conv for conv in conversations if 'unread_counts' not in conv]
+    if legacy_conversations:
+        await backfill_conversation_summaries(legacy_conversations)
     
-    # Enrich conversations with participant info and last message
-    enriched_conversations = []
     for conv in conversations:
-        # Get other participant info
-        other_user_id = conv['fan_id'] if conv['creator_id'] == current_user.id else conv['creator_id']
-        other_user = await db.users.find_one({"id": other_user_id})
-        
-        # Get creator info if needed
-        creator_info = None
-        if conv['creator_id'] != current_user.id:
-            creator_info = await db.creators.find_one({"user_id": conv['creator_id']})
-        
-        # Get last message
-        last_message = await db.messages.find_one(
-            {"conversation_id": conv['id']},
-            sort=[("created_at", -1)]
-        )
-        
-        # Count unread messages
-        unread_count = await db.messages.count_documents({
-            "conversation_id": conv['id'],
-            "sender_id": {"$ne": current_user.id},
-            "is_read": False
-        })
-        
-        enriched_conversations.append({
-            **conv,
-            "other_user": {
-                "id": other_user['id'],
-                "username": other_user['username'],
-                "full_name": other_user['full_name'],
-                "avatar_url": other_user.get('avatar_url'),
-                "is_creator": other_user['is_creator']
-            },
-            "creator_info": creator_info,
-            "last_message": last_message,
-            "unread_count": unread_count
-        })
+        conv['unread_count'] = conv.pop('unread_counts').get(current_user.id, 0)
+        conv.setdefault('last_message', None)
     
-    return enriched_conversations
+    return conversations
 
 @api_router.post("/conversations")
 async def create_conversation(
@@ -1563,9 +2308,87 @@ async def create_conversation(
     
     return {"conversation_id": conversation.id, "exists": False}
 
+async def mark_conversation_read(conversation_id: str, reader_id: str):
+    """Mark the messages other participants sent in a conversation as read"""
+    await asyncio.gather(
+        db.messages.update_many(
+            {
+                "conversation_id": conversation_id,
+                "sender_id": {"$ne": reader_id},
+                "is_read": False
+            },
+            {
+                "$set": {
+                    "is_read": True,
+                    "read_at": datetime.now(timezone.utc)
+                }
+            }
+        ),
+        db.conversations.update_one(
+            {"id": conversation_id},
+            {"$set": {f"unread_counts.{reader_id}": 0}}
+        )
+    )
+
+async def save_conversation_message(conversation: dict, message: Message) -> dict:
+    """Insert a message and update its conversation's last-message summary and the recipient's unread count.
+    
+    Returns the message without its encryption key, for real-time delivery.
+    """
+    recipient_id = conversation['fan_id'] if message.sender_id == conversation['creator_id'] else conversation['creator_id']
+    message_doc = message.dict()
+    last_message = {key: value for key, value in message_doc.items() if key != 'encryption_key'}
+    await asyncio.gather(
+        db.messages.insert_one(message_doc),
+        db.conversations.update_one(
+            {"id": conversation['id']},
+            {
+                "$set": {"last_message": last_message, "last_message_at": message.created_at},
+                "$inc": {f"unread_counts.{recipient_id}": 1}
+            }
+        )
+    )
+    return last_message
+
+async def backfill_conversation_summaries(conversations: List[dict]):
+    """Derive and store last_message/unread_counts for conversations that predate them"""
+    conversation_ids = [conv['id'] for conv in conversations]
+    last_messages, unread_by_sender = await asyncio.gather(
+        db.messages.aggregate([
+            {"$match": {"conversation_id": {"$in": conversation_ids}}},
+            {"$sort": {"conversation_id": 1, "created_at": -1}},
+            {"$group": {"_id": "$conversation_id", "last_message": {"$first": "$$ROOT"}}},
+            {"$project": {"last_message._id": 0, "last_message.encryption_key": 0}}
+        ]).to_list(length=None),
+        db.messages.aggregate([
+            {"$match": {"conversation_id": {"$in": conversation_ids}, "is_read": False}},
+            {"$group": {
+                "_id": {"conversation_id": "$conversation_id", "sender_id": "$sender_id"},
+                "count": {"$sum": 1}
+            }}
+        ]).to_list(length=None)
+    )
+    last_message_by_conversation = {item['_id']: item['last_message'] for item in last_messages}
+    unread_sent = {(item['_id']['conversation_id'], item['_id']['sender_id']): item['count'] for item in unread_by_sender}
+    
+    updates = []
+    for conv in conversations:
+        # Each participant's unread messages are the ones the other participant sent
+        conv['last_message'] = last_message_by_conversation.get(conv['id'])
+        conv['unread_counts'] = {
+            conv['creator_id']: unread_sent.get((conv['id'], conv['fan_id']), 0),
+            conv['fan_id']: unread_sent.get((conv['id'], conv['creator_id']), 0)
+        }
+        updates.append(UpdateOne(
+            {"id": conv['id'], "unread_counts": {"$exists": False}},
+            {"$set": {"last_message": conv['last_message'], "unread_counts": conv['unread_counts']}}
+        ))
+    await db.conversations.bulk_write(updates, ordered=False)
+
 @api_router.get("/conversations/{conversation_id}/messages")
 async def get_conversation_messages(
     conversation_id: str,
+    background_tasks: BackgroundTasks,
     skip: int = 0,
     limit: int = 50,
     current_user: User = Depends(get_current_user)
@@ -1584,33 +2407,11 @@ async def get_conversation_messages(
         {"conversation_id": conversation_id}
     ).sort("created_at", -1).skip(skip).limit(limit).to_list(length=None)
     
-    # Decrypt messages if encrypted
-    decrypted_messages = []
-    for msg in messages:
-        if msg.get('is_encrypted') and msg.get('encryption_key'):
-            if msg.get('content'):
-                msg['content'] = decrypt_message(msg['content'], msg['encryption_key'])
-        
-        # Remove encryption key from response
-        if 'encryption_key' in msg:
-            del msg['encryption_key']
-        
-        decrypted_messages.append(msg)
+    # Decrypt the whole page in one worker-thread hop so a long page doesn't hold up the event loop
+    decrypted_messages = await asyncio.to_thread(decrypt_messages, messages)
     
-    # Mark messages as read
-    await db.messages.update_many(
-        {
-            "conversation_id": conversation_id,
-            "sender_id": {"$ne": current_user.id},
-            "is_read": False
-        },
-        {
-            "$set": {
-                "is_read": True,
-                "read_at": datetime.now(timezone.utc)
-            }
-        }
-    )
+    # Mark messages as read once the response has gone out
+    background_tasks.add_task(mark_conversation_read, conversation_id, current_user.id)
     
     return {"messages": list(reversed(decrypted_messages))}
 
@@ -1645,12 +2446,11 @@ async def send_message(
     
     # Encrypt message if requested
     content = message_data.content
-    encryption_key = None
     is_encrypted = False
     
     if content and len(content) > 0:
         # Always encrypt sensitive messages
-        content, encryption_key = encrypt_message(content)
+        content = encrypt_message(content)
         is_encrypted = True
     
     # Set auto-destruct time if specified
@@ -1671,26 +2471,15 @@ async def send_message(
         is_tip=message_data.is_tip,
         tip_amount=message_data.tip_amount,
         is_encrypted=is_encrypted,
-        encryption_key=encryption_key,
         auto_destruct_at=auto_destruct_at
     )
     
-    await db.messages.insert_one(message.dict())
+    # Store the message and update the conversation's last message and unread count
+    message_for_send = await save_conversation_message(conversation, message)
     
-    # Update conversation last message time
-    await db.conversations.update_one(
-        {"id": message_data.conversation_id},
-        {"$set": {"last_message_at": datetime.now(timezone.utc)}}
-    )
-    
-    # Prepare message for real-time sending (without encryption key)
-    message_for_send = message.dict()
-    if message_for_send.get('encryption_key'):
-        del message_for_send['encryption_key']
-    
-    # Decrypt content for real-time sending
-    if is_encrypted and encryption_key:
-        message_for_send['content'] = decrypt_message(content, encryption_key)
+    # Real-time delivery carries the plaintext we just encrypted; no need to decrypt it again
+    if is_encrypted:
+        message_for_send = {**message_for_send, "content": message_data.content}
     
     # Send real-time message
     await manager.broadcast_to_conversation(
@@ -1733,21 +2522,18 @@ async def upload_message_file(
     if message_type not in allowed_types or file.content_type not in allowed_types[message_type]:
         raise HTTPException(status_code=400, detail="Invalid file type for message type")
     
-    # Read and validate file
-    file_content = await file.read()
-    if len(file_content) > 50 * 1024 * 1024:  # 50MB limit
-        raise HTTPException(status_code=400, detail="File too large (max 50MB)")
-    
-    # Store file in GridFS
-    file_id = await fs.upload_from_stream(
+    # Store file in GridFS, validating size (50MB limit) and hashing as it streams
+    file_id, file_size = await upload_to_gridfs(
+        file,
         file.filename,
-        io.BytesIO(file_content),
         metadata={
             "content_type": file.content_type,
             "message_type": message_type,
-            "uploaded_by": current_user.id,
-            "file_hash": generate_file_hash(file_content)
-        }
+            "uploaded_by": current_user.id
+        },
+        max_size=MESSAGE_FILE_MAX_SIZE,
+        too_large_detail="File too large (max 50MB)",
+        store_hash=True
     )
     
     # Determine sender type
@@ -1766,34 +2552,32 @@ async def upload_message_file(
         message_type=message_type,
         file_path=str(file_id),
         file_type=file.content_type,
-        file_size=len(file_content),
+        file_size=file_size,
         is_ppv=is_ppv,
         ppv_price=ppv_price,
         ppv_preview=ppv_preview,
         auto_destruct_at=auto_destruct_at
     )
     
-    await db.messages.insert_one(message.dict())
-    
-    # Update conversation last message time
-    await db.conversations.update_one(
-        {"id": conversation_id},
-        {"$set": {"last_message_at": datetime.now(timezone.utc)}}
-    )
+    # Store the message and update the conversation's last message and unread count
+    message_for_send = await save_conversation_message(conversation, message)
     
     # Send real-time message
     await manager.broadcast_to_conversation(
         {
             "type": "new_message",
-            "message": message.dict()
+            "message": message_for_send
         },
         [conversation['creator_id'], conversation['fan_id']]
     )
     
     return {"message": "File uploaded and sent successfully", "message_id": message.id}
 
+# Existence checks on message_payments read only indexed fields, so the index covers them
+PAID_LOOKUP_PROJECTION = {"_id": 0, "message_id": 1}
+
 @api_router.get("/messages/{message_id}/file")
-async def get_message_file(message_id: str, current_user: User = Depends(get_current_user)):
+async def get_message_file(message_id: str, request: Request, current_user: User = Depends(get_current_user)):
     """Get file from message"""
     message = await db.messages.find_one({"id": message_id})
     if not message:
@@ -1810,23 +2594,23 @@ async def get_message_file(message_id: str, current_user: User = Depends(get_cur
             "message_id": message_id,
             "payer_id": current_user.id,
             "payment_status": "paid"
-        })
+        }, PAID_LOOKUP_PROJECTION)
         if not payment:
             raise HTTPException(status_code=402, detail="Payment required to view this content")
     
     # Get file from GridFS
     try:
         file_id = ObjectId(message['file_path'])
-        grid_out = await fs.open_download_stream(file_id)
-        file_data = await grid_out.read()
-        
-        return StreamingResponse(
-            io.BytesIO(file_data),
-            media_type=message['file_type'],
-            headers={"Content-Disposition": f"inline; filename={grid_out.filename}"}
-        )
+        grid_out = await open_gridfs_file(file_id)
     except Exception as e:
         raise HTTPException(status_code=404, detail="File not found")
+    
+    return gridfs_streaming_response(
+        grid_out,
+        media_type=message['file_type'],
+        request=request,
+        headers={"Content-Disposition": f"inline; filename={grid_out.filename}"}
+    )
 
 @api_router.post("/messages/{message_id}/pay")
 async def pay_for_message(
@@ -1835,7 +2619,18 @@ async def pay_for_message(
     current_user: User = Depends(get_current_user)
 ):
     """Pay for PPV message"""
-    message = await db.messages.find_one({"id": message_id})
+    # The message and any earlier payment for it are looked up concurrently
+    message, existing_payment = await asyncio.gather(
+        db.messages.find_one({"id": message_id}, {"_id": 0, "is_ppv": 1, "sender_id": 1, "ppv_price": 1}),
+        db.message_payments.find_one(
+            {
+                "message_id": message_id,
+                "payer_id": current_user.id,
+                "payment_status": "paid"
+            },
+            PAID_LOOKUP_PROJECTION
+        )
+    )
     if not message:
         raise HTTPException(status_code=404, detail="Message not found")
     
@@ -1846,19 +2641,13 @@ async def pay_for_message(
         raise HTTPException(status_code=400, detail="Cannot pay for your own message")
     
     # Check if already paid
-    existing_payment = await db.message_payments.find_one({
-        "message_id": message_id,
-        "payer_id": current_user.id,
-        "payment_status": "paid"
-    })
-    
     if existing_payment:
         raise HTTPException(status_code=400, detail="Already paid for this message")
     
     # Create Stripe checkout session
-    host_url = str(request.base_url).rstrip('/')
+    host_url = get_public_base_url(request)
     webhook_url = f"{host_url}/api/webhook/stripe"
-    stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
+    stripe_checkout = get_stripe_checkout(webhook_url)
     
     success_url = f"{host_url}/messages/payment-success?session_id={{CHECKOUT_SESSION_ID}}"
     cancel_url = f"{host_url}/messages/{message_id}"
@@ -1878,16 +2667,13 @@ async def pay_for_message(
     
     session = await stripe_checkout.create_checkout_session(checkout_request)
     
-    # Store payment record
+    # Store payment and transaction records
     payment = MessagePayment(
         message_id=message_id,
         payer_id=current_user.id,
         amount=message['ppv_price'],
         stripe_session_id=session.session_id
     )
-    await db.message_payments.insert_one(payment.dict())
-    
-    # Store transaction record
     transaction = PaymentTransaction(
         user_id=current_user.id,
         creator_id=message['sender_id'],
@@ -1898,7 +2684,10 @@ async def pay_for_message(
             "message_id": message_id
         }
     )
-    await db.payment_transactions.insert_one(transaction.dict())
+    await asyncio.gather(
+        db.message_payments.insert_one(payment.dict()),
+        db.payment_transactions.insert_one(transaction.dict())
+    )
     
     return {"checkout_url": session.url, "session_id": session.session_id}
 
@@ -1910,7 +2699,7 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
         while True:
             data = await websocket.receive_text()
             # Handle incoming WebSocket messages if needed
-            message_data = json.loads(data)
+            message_data = orjson.loads(data)
             
             # Echo back for connection testing
             await manager.send_personal_message({
@@ -1919,44 +2708,66 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
             }, user_id)
             
     except WebSocketDisconnect:
-        manager.disconnect(user_id)
+        manager.disconnect(user_id, websocket)
 
 # Dashboard Routes
+# How long stored dashboard counters are trusted before being recomputed from source collections
+CREATOR_STATS_RECONCILE_SECONDS = int(os.environ.get('CREATOR_STATS_RECONCILE_SECONDS', '3600'))
+# Only the stored counters (and what's needed to backfill them) are read for the stats card
+CREATOR_STATS_PROJECTION = {
+    "_id": 0, "id": 1, "subscriber_count": 1, "content_count": 1,
+    "total_revenue": 1, "follower_count": 1, "stats_reconciled_at": 1
+}
+
 @api_router.get("/dashboard/creator/stats")
 async def get_creator_stats(current_user: User = Depends(get_current_user)):
-    creator = await db.creators.find_one({"user_id": current_user.id})
+    creator = await db.creators.find_one({"user_id": current_user.id}, CREATOR_STATS_PROJECTION)
     if not creator:
         raise HTTPException(status_code=403, detail="User is not a creator")
     
-    # Get statistics
-    total_subscribers = await db.subscriptions.count_documents({
-        "creator_id": creator['id'],
-        "status": "active"
-    })
-    
-    total_revenue = await db.payment_transactions.aggregate([
-        {"$match": {
-            "creator_id": creator['id'],
-            "payment_status": "paid"
-        }},
-        {"$group": {
-            "_id": None,
-            "total": {"$sum": "$amount"}
-        }}
-    ]).to_list(1)
-    
-    revenue = total_revenue[0]['total'] if total_revenue else 0
+    # Counters are maintained by process_successful_payment. Subscriptions lapse without any
+    # write, so they're recomputed from the source collections when missing or older than
+    # CREATOR_STATS_RECONCILE_SECONDS
+    reconciled_at = creator.get('stats_reconciled_at')
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=CREATOR_STATS_RECONCILE_SECONDS)
+    if not reconciled_at or reconciled_at.replace(tzinfo=timezone.utc) < stale_before:
+        creator.update(await reconcile_creator_stats(creator['id']))
     
     return {
-        "subscriber_count": total_subscribers,
+        "subscriber_count": creator.get('subscriber_count', 0),
         "content_count": creator['content_count'],
-        "total_revenue": revenue,
+        "total_revenue": creator.get('total_revenue', 0),
         "follower_count": creator['follower_count']
     }
 
 # Include router
 app.include_router(api_router)
 
+class UploadSizeLimitMiddleware:
+    """Reject uploads whose declared Content-Length is already over the route's limit, before the body is read"""
+    ROUTE_LIMITS = [
+        (re.compile(r"/api/creators/[^/]+/upload-banner"), BANNER_MAX_SIZE),
+        (re.compile(r"/api/creators/[^/]+/upload-welcome-video"), WELCOME_VIDEO_MAX_SIZE),
+        (re.compile(r"/api/messages/upload"), MESSAGE_FILE_MAX_SIZE)
+    ]
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST":
+            limit = next((limit for pattern, limit in self.ROUTE_LIMITS if pattern.fullmatch(scope["path"])), None)
+            if limit is not None:
+                content_length = dict(scope["headers"]).get(b"content-length", b"")
+                if content_length.isdigit() and int(content_length) > limit + MULTIPART_OVERHEAD_BYTES:
+                    response = ORJSONResponse({"detail": "File too large"}, status_code=413)
+                    await response(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
+
+# Runs inside CORS so browsers can read the 413
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # CORS Middleware
 app.add_middleware(
     CORSMiddleware,
@@ -1964,15 +2775,121 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
-# Configure logging
+class MediaAwareGZipMiddleware:
+    """GZip responses except the GridFS media routes, which are already compressed and serve byte ranges"""
+    UNCOMPRESSED_ROUTES = [
+        re.compile(r"/api/creators/[^/]+/banner/[^/]+"),
+        re.compile(r"/api/creators/[^/]+/welcome-video/[^/]+"),
+        re.compile(r"/api/content/[^/]+/file"),
+        re.compile(r"/api/messages/[^/]+/file")
+    ]
+    
+    def __init__(self, app, **gzip_options):
+        self.app = app
+        self.gzip = GZipMiddleware(app, **gzip_options)
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and any(pattern.fullmatch(scope["path"]) for pattern in self.UNCOMPRESSED_ROUTES):
+            await self.app(scope, receive, send)
+            return
+        await self.gzip(scope, receive, send)
+
+# Compress larger JSON responses
+app.add_middleware(MediaAwareGZipMiddleware, minimum_size=1024, compresslevel=5)
+
+# Configure logging. Records are formatted in place and written by a listener thread,
+# so a slow stderr or log file never blocks the event loop
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, logging.StreamHandler())
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[QueueHandler(_log_queue)]
 )
-logger = logging.getLogger(__name__)
+_log_listener.start()
+
+async def ensure_indexes():
+    """Create the indexes backing the hot query shapes (no-op if they already exist)"""
+    # Unique indexes fail on existing duplicates; each failure is logged and the rest still
+    # get created, so bad legacy data degrades a query rather than keeping the app down
+    results = await asyncio.gather(
+        db.users.create_index("id", unique=True),
+        db.users.create_index("email", unique=True),
+        db.users.create_index("username", unique=True),
+        db.creators.create_index("id", unique=True),
+        db.creators.create_index("user_id"),
+        db.creators.create_index([("category", 1), ("created_at", -1)]),
+        db.creators.create_index([("display_name", "text"), ("bio", "text"), ("tags", "text")]),
+        db.content.create_index("id", unique=True),
+        # id breaks created_at ties so keyset pages are stable
+        db.content.create_index([("creator_id", 1), ("created_at", -1), ("id", -1)]),
+        db.content.create_index([("created_at", -1), ("id", -1)]),
+        db.content.create_index([("creator_id", 1), ("is_premium", 1), ("is_ppv", 1), ("created_at", -1)]),
+        # Partial on status=active so only live subscriptions are indexed; legacy duplicates
+        # make this fail until scripts/dedupe_active_subscriptions.py has been run
+        db.subscriptions.create_index(
+            [("user_id", 1), ("creator_id", 1)],
+            unique=True,
+            partialFilterExpression={"status": "active"},
+            name="unique_active_subscription"
+        ),
+        db.subscriptions.create_index(
+            [("creator_id", 1), ("expires_at", 1)],
+            partialFilterExpression={"status": "active"}
+        ),
+        db.payment_transactions.create_index("stripe_session_id", unique=True),
+        db.payment_transactions.create_index([("creator_id", 1), ("payment_status", 1)]),
+        db.payment_transactions.create_index([("user_id", 1), ("metadata.content_id", 1)]),
+        db.conversations.create_index("id", unique=True),
+        db.conversations.create_index([("creator_id", 1), ("fan_id", 1)]),
+        db.conversations.create_index("fan_id"),
+        db.messages.create_index("id", unique=True),
+        db.messages.create_index([("conversation_id", 1), ("created_at", -1)]),
+        # Unread counts and mark-as-read
+        db.messages.create_index([("conversation_id", 1), ("is_read", 1), ("sender_id", 1)]),
+        db.scheduled_content.create_index("id", unique=True),
+        # Publisher scan and the creator's schedule listing
+        db.scheduled_content.create_index([("status", 1), ("scheduled_date", 1)]),
+        db.scheduled_content.create_index([("creator_id", 1), ("scheduled_date", 1), ("id", 1)]),
+        db.content_templates.create_index("creator_id"),
+        # Revocations are only needed until the token would have expired anyway
+        db.revoked_tokens.create_index("expires_at", expireAfterSeconds=0),
+        # PPV message access and pay-once checks; only paid records are ever looked up this way
+        db.message_payments.create_index(
+            [("message_id", 1), ("payer_id", 1), ("payment_status", 1)],
+            partialFilterExpression={"payment_status": "paid"}
+        ),
+        # GridFSBucket creates these itself on first write; uploads now write chunks directly
+        fs_chunks.create_index([("files_id", 1), ("n", 1)], unique=True),
+        fs_files.create_index([("filename", 1), ("uploadDate", 1)]),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(
+                "Index creation failed (deduplicate the data and restart to enforce it; for "
+                "unique_active_subscription run scripts/dedupe_active_subscriptions.py): %s", result
+            )
+
+@app.on_event("startup")
+async def startup_db_client():
+    # Python 3.12+: tasks that finish without suspending (gathered cache hits, queue puts) skip a loop hop
+    if hasattr(asyncio, "eager_task_factory"):
+        asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+    await ensure_indexes()
+    global _scheduler_task, _stripe_checkout
+    if PUBLIC_BASE_URL:
+        _stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=f"{PUBLIC_BASE_URL}/api/webhook/stripe")
+    _scheduler_task = asyncio.create_task(scheduled_publisher_loop())
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    if _scheduler_task:
+        _scheduler_task.cancel()
+    client.close()
+    _bcrypt_pool.shutdown(wait=False)
+    # Last, so everything logged during shutdown is flushed
+    _log_listener.stop()
\ No newline at end of file
@@ -21,6 +21,8 @@ class CreatorPlatformTester:
         self.tests_run = 0
         self.tests_passed = 0
         self.test_results = []
+        # One pooled session so every request reuses the same keep-alive connection
+        self.session = requests.Session()
 
     def log_test(self, name: str, success: bool, details: str = ""):
         """Log test results"""
@@ -49,18 +51,18 @@ class CreatorPlatformTester:
         
         try:
             if method.upper() == 'GET':
-                response = requests.get(url, headers=headers)
+                response = self.session.get(url, headers=headers)
             elif method.upper() == 'POST':
                 if files:
                     # Remove Content-Type for multipart/form-data
                     headers.pop('Content-Type', None)
-                    response = requests.post(url, data=data, files=files, headers=headers)
+                    response = self.session.post(url, data=data, files=files, headers=headers)
                 else:
-                    response = requests.post(url, json=data, headers=headers)
+                    response = self.session.post(url, json=data, headers=headers)
             elif method.upper() == 'PUT':
-                response = requests.put(url, json=data, headers=headers)
+                response = self.session.put(url, json=data, headers=headers)
             elif method.upper() == 'DELETE':
-                response = requests.delete(url, headers=headers)
+                response = self.session.delete(url, headers=headers)
             else:
                 return False, {"error": f"Unsupported method: {method}"}
 
@@ -81,7 +83,7 @@ class CreatorPlatformTester:
     def test_health_check(self):
         """Test if backend is accessible"""
         try:
-            response = requests.get(f"{self.base_url}/docs", timeout=10)
+            response = self.session.get(f"{self.base_url}/docs", timeout=10)
             success = response.status_code == 200
             self.log_test("Backend Health Check", success, 
                          f"Status: {response.status_code}" if not success else "")
@@ -253,7 +255,7 @@ class CreatorPlatformTester:
         headers = {'Authorization': f'Bearer {self.token}'}
         
         try:
-            response = requests.post(url, data=content_data, headers=headers)
+            response = self.session.post(url, data=content_data, headers=headers)
             success = response.status_code == 200
             
             if success:
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+One-off migration: retire duplicate active subscriptions so the unique_active_subscription index can be built
+Checkout races from before the index left some (user, creator) pairs with several active rows;
+the newest of each pair is kept and the others are marked expired. Dry run unless --apply is given
+"""
+
+import os
+import sys
+import logging
+from pathlib import Path
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+def dedupe_active_subscriptions(apply: bool):
+    """Expire all but the newest active subscription of each (user, creator) pair"""
+    load_dotenv(Path(__file__).parent.parent / 'backend' / '.env')
+    try:
+        client = MongoClient(os.environ['MONGO_URL'])
+        db = client[os.environ['DB_NAME']]
+    except KeyError as e:
+        logging.error(f"Missing required environment variable: {e}")
+        return False
+
+    try:
+        duplicates = db.subscriptions.aggregate([
+            {"$match": {"status": "active"}},
+            {"$sort": {"created_at": -1}},
+            {"$group": {
+                "_id": {"user_id": "$user_id", "creator_id": "$creator_id"},
+                "subscriptions": {"$push": {"_id": "$_id", "id": "$id", "created_at": "$created_at"}},
+                "count": {"$sum": 1}
+            }},
+            {"$match": {"count": {"$gt": 1}}}
+        ], allowDiskUse=True)
+
+        stale_ids = []
+        for group in duplicates:
+            kept, *stale = group['subscriptions']
+            for subscription in stale:
+                logging.info(
+                    f"Retiring subscription {subscription.get('id')} "
+                    f"(user {group['_id']['user_id']}, creator {group['_id']['creator_id']}, "
+                    f"created {subscription.get('created_at')}); keeping {kept.get('id')}"
+                )
+                stale_ids.append(subscription['_id'])
+
+        if not stale_ids:
+            logging.info("No duplicate active subscriptions found")
+        elif apply:
+            result = db.subscriptions.update_many(
+                {"_id": {"$in": stale_ids}, "status": "active"},
+                {"$set": {"status": "expired"}}
+            )
+            logging.info(f"Expired {result.modified_count} duplicate active subscriptions")
+        else:
+            logging.info(f"Dry run: {len(stale_ids)} subscriptions would be expired; re-run with --apply")
+        return True
+    except Exception as e:
+        logging.error(f"Failed to deduplicate subscriptions: {str(e)}")
+        return False
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    logging.info("Starting active subscription cleanup")
+
+    if dedupe_active_subscriptions(apply='--apply' in sys.argv[1:]):
+        logging.info("Active subscription cleanup completed successfully")
+        sys.exit(0)
+    else:
+        logging.error("Active subscription cleanup failed")
+        sys.exit(1)
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
-Script to automatically publish scheduled content
-This script should be run as a cron job every 5-10 minutes
+Script to publish scheduled content on demand
+The backend publishes due content on its own; this forces an immediate run
 """
 
 import requests
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+One-off migration: remove stored copies of the server encryption key from messages
+Messages encrypted with the current ENCRYPTION_KEY decrypt without a per-message key;
+messages written under any other key keep theirs, since it is the only way to read them
+"""
+
+import os
+import sys
+import logging
+from pathlib import Path
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+def strip_message_keys():
+    """Unset encryption_key on every message that stores the current server key"""
+    load_dotenv(Path(__file__).parent.parent / 'backend' / '.env')
+    try:
+        encryption_key = os.environ['ENCRYPTION_KEY']
+        client = MongoClient(os.environ['MONGO_URL'])
+        db = client[os.environ['DB_NAME']]
+    except KeyError as e:
+        logging.error(f"Missing required environment variable: {e}")
+        return False
+
+    try:
+        result = db.messages.update_many(
+            {"encryption_key": encryption_key},
+            {"$unset": {"encryption_key": ""}}
+        )
+        logging.info(f"Removed stored encryption keys from {result.modified_count} messages")
+
+        remaining = db.messages.count_documents({"encryption_key": {"$type": "string"}})
+        if remaining:
+            logging.info(f"{remaining} messages keep a key of their own (written under a different ENCRYPTION_KEY)")
+        return True
+    except Exception as e:
+        logging.error(f"Failed to strip message keys: {str(e)}")
+        return False
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    logging.info("Starting message key cleanup")
+
+    if strip_message_keys():
+        logging.info("Message key cleanup completed successfully")
+        sys.exit(0)
+    else:
+        logging.error("Message key cleanup failed")
+        sys.exit(1)
@@ -0,0 +1,111 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+# server.py reads its configuration at import time; point it at throwaway values
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'test_database')
+os.environ.setdefault('PASSWORD_PEPPER', 'test-pepper')
+os.environ.setdefault('ENCRYPTION_KEY', 'ZmDfcTF7_60GrrY167zsiPd67pEvs0aGOv2oasOM1Pg=')
+sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
+
+from fastapi import HTTPException  # noqa: E402
+from fastapi.responses import Response  # noqa: E402
+
+import server  # noqa: E402
+
+
+# Range header parsing
+def test_range_header_missing():
+    assert server.parse_range_header(None, 100) is None
+    assert server.parse_range_header('', 100) is None
+
+def test_range_header_closed():
+    assert server.parse_range_header('bytes=0-9', 100) == (0, 9)
+    assert server.parse_range_header('bytes=10-19', 100) == (10, 19)
+
+def test_range_header_end_clamped_to_length():
+    assert server.parse_range_header('bytes=90-500', 100) == (90, 99)
+
+def test_range_header_open_ended():
+    assert server.parse_range_header('bytes=50-', 100) == (50, 99)
+
+def test_range_header_suffix():
+    assert server.parse_range_header('bytes=-10', 100) == (90, 99)
+    # A suffix longer than the file means the whole file
+    assert server.parse_range_header('bytes=-500', 100) == (0, 99)
+
+@pytest.mark.parametrize('range_header', [
+    'bytes=100-',     # starts past the end
+    'bytes=20-10',    # end before start
+    'bytes=abc-def',  # not numbers
+    'bytes=0-1,5-6',  # multiple ranges
+    'items=0-9',      # wrong unit
+])
+def test_range_header_unsatisfiable(range_header):
+    with pytest.raises(HTTPException) as exc_info:
+        server.parse_range_header(range_header, 100)
+    assert exc_info.value.status_code == 416
+    assert exc_info.value.headers['Content-Range'] == 'bytes */100'
+
+
+# Keyset pagination cursors
+def test_page_cursor_round_trip():
+    sort_value = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    cursor = server.encode_page_cursor(sort_value, 'doc-1')
+
+    assert server.keyset_filter('created_at', cursor, descending=True) == {"$or": [
+        {'created_at': {'$lt': sort_value}},
+        {'created_at': sort_value, 'id': {'$lt': 'doc-1'}}
+    ]}
+    assert server.keyset_filter('created_at', cursor, descending=False) == {"$or": [
+        {'created_at': {'$gt': sort_value}},
+        {'created_at': sort_value, 'id': {'$gt': 'doc-1'}}
+    ]}
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', '', 'W10=', 'WyJub3QtYS1kYXRlIiwiaWQiXQ=='])
+def test_page_cursor_invalid(cursor):
+    with pytest.raises(HTTPException) as exc_info:
+        server.keyset_filter('created_at', cursor, descending=True)
+    assert exc_info.value.status_code == 400
+
+def test_next_cursor_only_for_full_pages():
+    items = [
+        {'id': 'a', 'created_at': datetime(2024, 5, 2, tzinfo=timezone.utc)},
+        {'id': 'b', 'created_at': datetime(2024, 5, 1, tzinfo=timezone.utc)},
+    ]
+
+    response = Response()
+    server.set_next_cursor(response, items, 3, 'created_at')
+    assert 'X-Next-Cursor' not in response.headers
+
+    response = Response()
+    server.set_next_cursor(response, items, 2, 'created_at')
+    assert response.headers['X-Next-Cursor'] == server.encode_page_cursor(items[-1]['created_at'], 'b')
+
+
+# Password hashes
+def test_password_hash_round_trip():
+    async def round_trip():
+        hashed = await server.hash_password('correct horse')
+        return hashed, await server.verify_password('correct horse', hashed), await server.verify_password('wrong horse', hashed)
+
+    hashed, correct, wrong = asyncio.run(round_trip())
+    assert hashed.startswith(f"{server.PEPPERED_HASH_PREFIX}{server.PASSWORD_PEPPER_ID}$")
+    assert correct
+    assert not wrong
+    assert not server.password_needs_rehash(hashed)
+
+def test_legacy_password_hash_needs_rehash():
+    assert server.password_needs_rehash(server.bcrypt.hashpw(b'correct horse', server.bcrypt.gensalt(rounds=4)).decode())
+
+
+# Message encryption
+def test_message_encryption_round_trip():
+    encrypted = server.encrypt_message('hello')
+    assert encrypted.startswith(server.AESGCM_PREFIX)
+    assert server.decrypt_message(encrypted) == 'hello'